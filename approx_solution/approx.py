@@ -3,292 +3,1133 @@
 Faster Max-3-SAT anytime approximation using WalkSAT-style local search
 Keeps input/output format identical to the original program.
 """
+import json
+import os
 import random
+import signal
 import sys
 import time
-from multiprocessing import Process, Pipe
+from array import array
+from multiprocessing import Array, Event, Pipe, Process, Value
 import argparse
 
+try:
+    import numpy as np
+except ImportError:  # batch restarts fall back to scoring samples one by one
+    np = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+from bound import core_bound
+from cache import CachedInstance, load_cached
+from loader import load_instance
+from preprocess import preprocess
+from shared import SharedInstance, bitset_size, pack_bits, unpack_bits
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Max-3-SAT WalkSAT-style anytime solver")
     parser.add_argument("-t", type=int, default=2,
                         help="Amount of time for program to run (in seconds)")
     parser.add_argument("-p", type=int, default=1,
                         help="The number of parallel processes to use")
+    parser.add_argument("--engine", choices=tuple(ENGINES), default="walksat",
+                        help="Local search engine: WalkSAT with restarts or dynamic clause weighting")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Base random seed; worker i searches with its own stream derived from it")
+    parser.add_argument("--portfolio", action="store_true",
+                        help="With -p: workers run different configs, share their best assignment "
+                             "and all stop once one reaches the target")
+    parser.add_argument("--restart-samples", type=int, default=1,
+                        help="Random assignments scored per restart (batched with NumPy); "
+                             "local search starts from the best one")
+    parser.add_argument("--init", choices=INITIALIZERS, default="random",
+                        help="Starting assignment of each restart: uniform random, majority "
+                             "polarity, Johnson's derandomized 7/8 assignment, or the best so far "
+                             "with a few variables flipped")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Adapt the random-walk noise to stagnation (Hoos-style adaptive WalkSAT)")
+    parser.add_argument("--restarts", choices=("fixed", "luby", "geometric"), default="fixed",
+                        help="Restart length schedule, in units of 1000 flips")
+    parser.add_argument("--no-preprocess", action="store_true",
+                        help="Search the raw instance instead of the simplified one "
+                             "(merged duplicates, no tautologies / pure literals / unused vars)")
+    parser.add_argument("--cache", metavar="DIR", default=os.environ.get("MAX3SAT_CACHE"),
+                        help="Reuse compiled instances (mmap'd binary files keyed by input hash) "
+                             "from DIR (default: $MAX3SAT_CACHE, unset = no cache)")
+    parser.add_argument("--stream", metavar="FILE", default=None,
+                        help="Write every new best as a JSON line (time, score) to FILE "
+                             "as soon as it is found ('-' = stderr)")
+    parser.add_argument("--stream-assign", action="store_true",
+                        help="With --stream: include the assignment (T/F string) in each line")
+    parser.add_argument("--bound", action="store_true",
+                        help="Prove an upper bound (disjoint inconsistent cores) in a separate "
+                             "process, stop as soon as the best score meets it and report the gap "
+                             "on stderr")
+    parser.add_argument("--stats", metavar="FILE", default=None,
+                        help="Write a JSON report of the search (flips/sec, restarts, greedy vs "
+                             "random steps, improvement history, per-worker figures) to FILE "
+                             "('-' = stderr)")
     parser.add_argument("filename", type=str, nargs='?', default="-",
                         help="Input file name (default: read from stdin)")
     return parser.parse_args()
 
 def read_input():
-    n, m = map(int, sys.stdin.readline().strip().split())
-    clauses = []
-    for _ in range(m):
-        a, b, c = map(int, sys.stdin.readline().strip().split())
-        clauses.append((a, b, c))
-    return n, m, clauses
+    return load_instance("-")
 
 def read_file(filename):
-    with open(filename, 'r') as f:
-        n, m = map(int, f.readline().strip().split())
-        clauses = []
-        for _ in range(m):
-            a, b, c = map(int, f.readline().strip().split())
-            clauses.append((a, b, c))
-    return n, m, clauses
-
-# helper: literal satisfied given assignment list (1..n)
+    # project "n m" format, DIMACS cnf/wcnf, optionally gzipped
+    return load_instance(filename)
+
+# helper: literal satisfied given assignment (indexed 1..n)
 def literal_satisfied(lit, assign):
     if lit > 0:
         return assign[lit]
     else:
         return not assign[-lit]
 
-def initial_assignment(n):
-    # list indexed 0..n, ignore index 0 for simplicity
-    return [False] + [bool(random.getrandbits(1)) for _ in range(n)]
-
-def build_occurrences(n, clauses):
-    """Build pos_occ and neg_occ: for each var, list of clause indices where it appears"""
-    m = len(clauses)
-    pos_occ = [[] for _ in range(n+1)]
-    neg_occ = [[] for _ in range(n+1)]
-    for i, cl in enumerate(clauses):
-        a,b,c = cl
-        for lit in (a,b,c):
-            v = abs(lit)
-            if lit > 0:
-                pos_occ[v].append(i)
-            else:
-                neg_occ[v].append(i)
-    return pos_occ, neg_occ
+def initial_assignment(n, rng=random):
+    # bytearray of 0/1 indexed 0..n, ignore index 0 for simplicity
+    assign = bytearray(rng.getrandbits(1) for _ in range(n+1))
+    assign[0] = 0
+    return assign
+
+# --init: how a restart picks its starting assignment
+INITIALIZERS = ("random", "majority", "johnson", "perturb")
+MAJORITY_NOISE = 0.05    # majority: share of variables set against their majority
+PERTURB_FRACTION = 0.05  # perturb: share of variables flipped in the best assignment
+
+def majority_assignment(inst, rng, noise=MAJORITY_NOISE):
+    """
+    Each variable takes the sign it occurs with most (by clause weight),
+    ties at random; a noise share is then set the other way so restarts
+    do not all begin from the same point.
+    """
+    n = inst.n
+    occ_start = inst.occ_start
+    cw = inst.weights
+    assign = bytearray(n+1)
+    for v in range(1, n+1):
+        if cw is None:
+            pos = occ_start[2*v+1] - occ_start[2*v]
+            neg = occ_start[2*v+2] - occ_start[2*v+1]
+        else:
+            pos = sum(cw[ci] for ci in inst.pos_occ(v))
+            neg = sum(cw[ci] for ci in inst.neg_occ(v))
+        value = 1 if pos > neg else 0 if pos < neg else rng.getrandbits(1)
+        if rng.random() < noise:
+            value ^= 1
+        assign[v] = value
+    return assign
+
+def johnson_assignment(inst, rng):
+    """
+    Johnson's derandomized assignment (method of conditional expectations).
+    Variables are fixed one at a time, in random order, to the value that
+    does not lower the expected satisfied weight of a uniformly random
+    completion. A clause with k free literals left contributes w*2^-k to
+    the choice, so the result satisfies at least the starting expectation,
+    7/8 of every 3-literal clause.
+    """
+    n, m = inst.n, inst.m
+    lits = inst.lits
+    occ, occ_start = inst.occ, inst.occ_start
+    cw = inst.weights if inst.weights is not None else array('i', [1]) * m
+    # free literals per clause; done once satisfied (tautologies always are)
+    free = bytearray(m)
+    for ci in range(m):
+        k = 3*ci
+        free[ci] = (lits[k] != 0) + (lits[k+1] != 0) + (lits[k+2] != 0)
+    done = bytearray(inst.tautology)
+    order = list(range(1, n+1))
+    rng.shuffle(order)
+    assign = bytearray(n+1)
+    for v in order:
+        pos = occ[occ_start[2*v]:occ_start[2*v+1]]
+        neg = occ[occ_start[2*v+1]:occ_start[2*v+2]]
+        # expectations scaled by 8 so the 2^-k terms stay integers
+        up = 0
+        for ci in pos:
+            if not done[ci]:
+                up += cw[ci] << (3 - free[ci])
+        down = 0
+        for ci in neg:
+            if not done[ci]:
+                down += cw[ci] << (3 - free[ci])
+        value = 1 if up > down else 0 if up < down else rng.getrandbits(1)
+        assign[v] = value
+        satisfied, shrunk = (pos, neg) if value else (neg, pos)
+        for ci in satisfied:
+            done[ci] = 1
+        for ci in shrunk:
+            free[ci] -= 1
+    return assign
+
+def perturbed_assignment(base, rng, fraction=PERTURB_FRACTION):
+    """Copy of base with a random fraction of its variables flipped."""
+    assign = bytearray(base)
+    n = len(assign) - 1
+    if n > 0:
+        for v in rng.sample(range(1, n+1), max(1, int(fraction * n))):
+            assign[v] ^= 1
+    return assign
+
+def draw_assignment(inst, init, rng, base=None):
+    """One starting assignment from the --init method (random without a base for perturb)."""
+    if init == "majority":
+        return majority_assignment(inst, rng)
+    if init == "johnson":
+        return johnson_assignment(inst, rng)
+    if init == "perturb" and base is not None:
+        return perturbed_assignment(base, rng)
+    return initial_assignment(inst.n, rng)
+
+def worker_rng(seed, worker_index):
+    """
+    Independent, reproducible random stream for one search process. Seeding
+    from a string hashes it (sha512), so nearby (seed, index) pairs still
+    give unrelated streams, and worker 0 of a -p run replays a -p 1 run
+    with the same seed.
+    """
+    return random.Random(f"{seed}:{worker_index}")
 
-def evaluate_initial_true_counts(clauses, assign):
-    """Return true_count list and initial satisfied count"""
-    m = len(clauses)
-    true_count = [0]*m
+def evaluate_initial_true_counts(inst, assign):
+    """
+    Return true_count (bytearray, true literals per clause) and the initial
+    satisfied count (total weight on a weighted instance). Tautologies are
+    pinned at 1 since no flip touches them.
+    """
+    lits = inst.lits
+    tautology = inst.tautology
+    cw = inst.weights
+    true_count = bytearray(inst.m)
     sat = 0
-    for i, cl in enumerate(clauses):
-        a,b,c = cl
+    for i in range(inst.m):
+        if tautology[i]:
+            true_count[i] = 1
+            sat += 1 if cw is None else cw[i]
+            continue
         cnt = 0
-        if literal_satisfied(a, assign): cnt += 1
-        if literal_satisfied(b, assign): cnt += 1
-        if literal_satisfied(c, assign): cnt += 1
+        for lit in lits[3*i:3*i+3]:
+            if lit and literal_satisfied(lit, assign): cnt += 1
         true_count[i] = cnt
-        if cnt > 0: sat += 1
+        if cnt > 0: sat += 1 if cw is None else cw[i]
     return true_count, sat
 
-def compute_flip_gain(var, clauses, assign, true_count, pos_occ, neg_occ):
+def evaluate_batch(inst, assigns):
+    """
+    Score k assignments at once with NumPy. assigns is a (k, n+1) uint8 0/1
+    matrix, one assignment per row, column 0 unused and 0 (the padding slot
+    of collapsed clauses reads it). Each of the 3 literal columns is one
+    fancy-indexing gather over the clause literal array. Returns
+    (true_counts, sats): a (k, m) uint8 matrix of true literals per clause
+    (tautologies pinned at 1, as in evaluate_initial_true_counts) and the
+    (k,) satisfied totals (weighted on a weighted instance).
+    """
+    lits = np.frombuffer(inst.lits, dtype=np.int32).reshape(-1, 3)
+    true_counts = np.zeros((assigns.shape[0], inst.m), dtype=np.uint8)
+    for j in range(3):
+        col = lits[:, j]
+        true_counts += assigns[:, np.abs(col)] ^ (col < 0).astype(np.uint8)
+    true_counts[:, np.frombuffer(inst.tautology, dtype=np.uint8) != 0] = 1
+    if inst.weights is None:
+        sats = np.count_nonzero(true_counts, axis=1)
+    else:
+        sats = (true_counts > 0) @ np.frombuffer(inst.weights, dtype=np.int32).astype(np.int64)
+    return true_counts, sats
+
+def sample_restart(inst, samples, rng, init="random", base=None):
     """
-    Compute change in number of satisfied clauses (delta) when flipping var.
-    Only iterates clauses where var occurs.
+    Draw `samples` starting assignments (uniformly random, or from the init
+    method, see draw_assignment) and keep the one satisfying the most
+    clauses. Returns (assign, true_count, sat); true_count and sat are None
+    for a single sample, which is not scored here. With NumPy all samples
+    are scored in one evaluate_batch call.
     """
+    n = inst.n
+    if samples <= 1:
+        return draw_assignment(inst, init, rng, base), None, None
+    if np is None:
+        best = None
+        for _ in range(samples):
+            assign = draw_assignment(inst, init, rng, base)
+            true_count, sat = evaluate_initial_true_counts(inst, assign)
+            if best is None or sat > best[2]:
+                best = (assign, true_count, sat)
+        return best
+    if init == "random" or (init == "perturb" and base is None):
+        gen = np.random.default_rng(rng.getrandbits(64))
+        assigns = gen.integers(0, 2, size=(samples, n+1), dtype=np.uint8)
+        assigns[:, 0] = 0
+    else:
+        assigns = np.array([np.frombuffer(draw_assignment(inst, init, rng, base), dtype=np.uint8)
+                            for _ in range(samples)])
+    true_counts, sats = evaluate_batch(inst, assigns)
+    best = int(np.argmax(sats))
+    return bytearray(assigns[best].tobytes()), bytearray(true_counts[best].tobytes()), int(sats[best])
+
+def build_unsat_index(true_count):
+    """
+    Build the unsatisfied-clause set as a dense array plus a position index.
+    unsat holds the indices of clauses with true_count 0 (in any order) and
+    unsat_pos[ci] is the position of clause ci inside unsat, or -1 if ci is
+    satisfied. do_flip keeps both up to date with swap-remove, so picking a
+    uniform random unsatisfied clause is O(1).
+    """
+    unsat = array('i')
+    unsat_pos = array('i', [-1]) * len(true_count)
+    for i, cnt in enumerate(true_count):
+        if cnt == 0:
+            unsat_pos[i] = len(unsat)
+            unsat.append(i)
+    return unsat, unsat_pos
+
+def flip_occurrences(var, inst, assign):
+    """
+    Return (became_true, became_false): the clauses whose literal of var turns
+    true / false when var is flipped.
+    """
+    if assign[var]:
+        return inst.neg_occ(var), inst.pos_occ(var)
+    return inst.pos_occ(var), inst.neg_occ(var)
+
+def compute_flip_gain(var, inst, assign, true_count):
+    """
+    Compute change in number (weight) of satisfied clauses (delta) when
+    flipping var. Only iterates clauses where var occurs.
+    """
+    became_true, became_false = flip_occurrences(var, inst, assign)
+    cw = inst.weights
     delta = 0
-    # if var is True now, flipping will make it False, and vice versa
-    cur_val = assign[var]
-    # positive occurrences: literal is var
-    for ci in pos_occ[var]:
-        cur_cnt = true_count[ci]
-        # contribution before flip: var contributes if cur_val True
-        contrib_before = 1 if cur_val else 0
-        contrib_after = 1 if (not cur_val) else 0
-        new_cnt = cur_cnt - contrib_before + contrib_after
-        # clause satisfaction change: was satisfied? will be?
-        if (cur_cnt > 0) and (new_cnt == 0):
-            delta -= 1
-        elif (cur_cnt == 0) and (new_cnt > 0):
-            delta += 1
-    # negative occurrences: literal is ¬var
-    for ci in neg_occ[var]:
-        cur_cnt = true_count[ci]
-        # contribution before flip: ¬var contributes if cur_val is False
-        contrib_before = 1 if (not cur_val) else 0
-        contrib_after = 1 if (not (not cur_val)) else 0  # after flip, var becomes not cur_val
-        # but simpler: contrib_after = 1 if cur_val else 0
-        contrib_after = 1 if cur_val else 0
-        new_cnt = cur_cnt - contrib_before + contrib_after
-        if (cur_cnt > 0) and (new_cnt == 0):
-            delta -= 1
-        elif (cur_cnt == 0) and (new_cnt > 0):
-            delta += 1
+    # an unsatisfied clause gains its first true literal
+    for ci in became_true:
+        if true_count[ci] == 0:
+            delta += 1 if cw is None else cw[ci]
+    # a clause loses its only true literal
+    for ci in became_false:
+        if true_count[ci] == 1:
+            delta -= 1 if cw is None else cw[ci]
     return delta
 
-def do_flip(var, assign, true_count, clauses, pos_occ, neg_occ):
-    """Flip var and update true_count. Return new satisfied count change (delta)."""
-    cur_val = assign[var]
+def do_flip(var, assign, true_count, inst, unsat=None, unsat_pos=None):
+    """
+    Flip var and update true_count. Return new satisfied count (weight) change (delta).
+    If unsat/unsat_pos (see build_unsat_index) are given they are kept in sync:
+    a clause that becomes unsatisfied is appended, a clause that becomes
+    satisfied is swap-removed in O(1).
+    """
+    became_true, became_false = flip_occurrences(var, inst, assign)
+    cw = inst.weights
     delta = 0
-    # positive occurrences
-    for ci in pos_occ[var]:
-        # compute contribution delta for this clause
-        # contribution before flip
-        contrib_before = 1 if cur_val else 0
-        contrib_after = 1 if (not cur_val) else 0
+    for ci in became_true:
         prev_cnt = true_count[ci]
-        new_cnt = prev_cnt - contrib_before + contrib_after
-        # update true_count
-        true_count[ci] = new_cnt
-        if prev_cnt == 0 and new_cnt > 0:
-            delta += 1
-        elif prev_cnt > 0 and new_cnt == 0:
-            delta -= 1
-    # negative occurrences
-    for ci in neg_occ[var]:
-        contrib_before = 1 if (not cur_val) else 0
-        contrib_after = 1 if cur_val else 0
+        true_count[ci] = prev_cnt + 1
+        if prev_cnt == 0:
+            delta += 1 if cw is None else cw[ci]
+            if unsat is not None:
+                unsat_remove(ci, unsat, unsat_pos)
+    for ci in became_false:
         prev_cnt = true_count[ci]
-        new_cnt = prev_cnt - contrib_before + contrib_after
-        true_count[ci] = new_cnt
-        if prev_cnt == 0 and new_cnt > 0:
-            delta += 1
-        elif prev_cnt > 0 and new_cnt == 0:
-            delta -= 1
+        true_count[ci] = prev_cnt - 1
+        if prev_cnt == 1:
+            delta -= 1 if cw is None else cw[ci]
+            if unsat is not None:
+                unsat_pos[ci] = len(unsat)
+                unsat.append(ci)
     # perform flip
-    assign[var] = not cur_val
+    assign[var] = not assign[var]
     return delta
 
-def walk_sat_anytime(n, m, clauses, time_limit=1.0, p_random_walk=0.4, max_flips_per_try=1000):
+def unsat_remove(ci, unsat, unsat_pos):
+    """Swap-remove clause ci from the unsatisfied set in O(1)."""
+    pos = unsat_pos[ci]
+    last = unsat.pop()
+    if last != ci:
+        unsat[pos] = last
+        unsat_pos[last] = pos
+    unsat_pos[ci] = -1
+
+def build_score_tables(inst, assign, weight=None):
+    """
+    Initialise the make/break tables of the clause-weighting engine (weight:
+    per-clause weights; None counts every clause as 1).
+    - true_count[ci]: number of true literals in clause ci (tautologies pinned at 1)
+    - crit[ci]: sum of the variables of the true literals in ci; when
+      true_count[ci] == 1 this is the single "critical" variable of the clause
+    - make[v]: unsatisfied clauses that flipping v would satisfy
+    - brk[v]: clauses in which v is the critical variable, i.e. clauses that
+      flipping v would break
+    make and brk sum weight[ci] over those clauses, weight defaulting to the
+    instance's clause weights (1 each if unweighted). Flip gain of v is then
+    make[v] - brk[v]. Index 0 of make is a scratch slot absorbing the 0
+    padding of clauses with a repeated literal. Returns
+    (true_count, crit, make, brk, sat), sat weighted by the instance weights.
     """
-    WalkSAT-style local search with restarts.
+    cw = inst.weights
+    if weight is None:
+        weight = cw
+    lits = inst.lits
+    tautology = inst.tautology
+    true_count = bytearray(inst.m)
+    crit = array('i', [0]) * inst.m
+    make = [0]*(inst.n+1)
+    brk = [0]*(inst.n+1)
+    sat = 0
+    for i in range(inst.m):
+        if tautology[i]:
+            true_count[i] = 1
+            sat += 1 if cw is None else cw[i]
+            continue
+        cnt = 0
+        total = 0
+        clause = lits[3*i:3*i+3]
+        for lit in clause:
+            if lit and literal_satisfied(lit, assign):
+                cnt += 1
+                total += abs(lit)
+        true_count[i] = cnt
+        crit[i] = total
+        w = 1 if weight is None else weight[i]
+        if cnt == 0:
+            for lit in clause:
+                make[abs(lit)] += w
+        else:
+            sat += 1 if cw is None else cw[i]
+            if cnt == 1:
+                brk[total] += w
+    return true_count, crit, make, brk, sat
+
+def do_flip_scored(var, assign, true_count, crit, make, brk, inst, unsat, unsat_pos, weight=None):
+    """
+    Table-mode counterpart of do_flip: flip var and keep true_count, crit,
+    make, brk (weighted by weight, default the instance weights) and the
+    unsatisfied set in sync. Return the change in satisfied clauses, counted
+    with the instance weights.
+    """
+    cw = inst.weights
+    if weight is None:
+        weight = cw
+    lits = inst.lits
+    became_true, became_false = flip_occurrences(var, inst, assign)
+    delta = 0
+    for ci in became_true:
+        cnt = true_count[ci]
+        if cnt == 0:
+            # clause becomes satisfied with var as its only true literal
+            w = 1 if weight is None else weight[ci]
+            k = 3*ci
+            make[abs(lits[k])] -= w
+            make[abs(lits[k+1])] -= w
+            make[abs(lits[k+2])] -= w
+            brk[var] += w
+            crit[ci] = var
+            unsat_remove(ci, unsat, unsat_pos)
+            delta += 1 if cw is None else cw[ci]
+        elif cnt == 1:
+            # previous critical variable no longer breaks this clause
+            brk[crit[ci]] -= 1 if weight is None else weight[ci]
+            crit[ci] += var
+        else:
+            crit[ci] += var
+        true_count[ci] = cnt + 1
+    for ci in became_false:
+        cnt = true_count[ci]
+        if cnt == 1:
+            # var was critical: clause becomes unsatisfied
+            w = 1 if weight is None else weight[ci]
+            brk[var] -= w
+            k = 3*ci
+            make[abs(lits[k])] += w
+            make[abs(lits[k+1])] += w
+            make[abs(lits[k+2])] += w
+            crit[ci] = 0
+            unsat_pos[ci] = len(unsat)
+            unsat.append(ci)
+            delta -= 1 if cw is None else cw[ci]
+        elif cnt == 2:
+            # the remaining true literal becomes critical
+            crit[ci] -= var
+            brk[crit[ci]] += 1 if weight is None else weight[ci]
+        else:
+            crit[ci] -= var
+        true_count[ci] = cnt - 1
+    assign[var] = not assign[var]
+    return delta
+
+# adaptive noise (Hoos 2002): raise the noise by ADAPT_PHI of the gap to 1
+# when the score has not improved for ADAPT_THETA*m flips, lower it by
+# ADAPT_PHI/2 of its value on every improvement
+ADAPT_PHI = 0.2
+ADAPT_THETA = 1/6
+# growth factor of the "geometric" restart schedule
+RESTART_GROWTH = 1.5
+
+def luby(i):
+    """i-th term (1-based) of the Luby sequence 1,1,2,1,1,2,4,1,1,2,..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k-1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k-1)
+
+def restart_length(schedule, base, restart_index):
+    """Flips allowed in restart number restart_index (0-based) under a schedule."""
+    if schedule == "luby":
+        return base * luby(restart_index + 1)
+    if schedule == "geometric":
+        return int(base * RESTART_GROWTH ** restart_index)
+    return base
+
+# flips between two reads of the clock / the shared stop flag
+CHECK_EVERY = 128
+
+def search_stats(engine, elapsed, flips, history, **counters):
+    """Counters of one search run as a JSON-ready dict (what --stats reports)."""
+    return {
+        "engine": engine,
+        "elapsed": round(elapsed, 4),
+        "flips": flips,
+        "flips_per_sec": round(flips / elapsed) if elapsed > 0 else 0,
+        "best_score": history[-1][1] if history else -1,
+        "time_to_best": round(history[-1][0], 4) if history else None,
+        **counters,
+        "history": [[round(t, 4), score] for t, score in history],
+    }
+
+def walk_sat_anytime(inst, time_limit=1.0, p_random_walk=0.4, max_flips_per_try=1000,
+                     rng=None, shared=None, stall_restarts=None,
+                     restart_samples=1, adaptive=False, restart_schedule="fixed", init="random",
+                     stats=None):
+    """
+    WalkSAT-style local search with restarts on an Instance.
     - p_random_walk: probability to flip a random variable in an unsatisfied clause
-    - max_flips_per_try: flips before a random restart
+      (only the starting value when adaptive, see ADAPT_PHI)
+    - max_flips_per_try: flips before a random restart; the base unit of the
+      schedule when restart_schedule is "luby" or "geometric"
+    - rng: random.Random driving every random choice (a fresh one if None)
+    - shared: SharedBest of a cooperative portfolio; improvements are published
+      to it and the search stops once any worker has reached its target
+    - stall_restarts: with shared, after this many restarts without a local
+      improvement the next restart starts from the global best instead
+    - restart_samples: random assignments scored per restart (batched with
+      NumPy); the search starts from the best of them
+    - adaptive: adapt the noise to stagnation instead of keeping p_random_walk
+    - restart_schedule: "fixed", "luby" or "geometric" restart lengths
+    - init: how restarts start (INITIALIZERS): uniformly random, majority
+      polarity, Johnson's derandomized assignment, or a perturbation of the
+      best assignment so far (the shared one when running with shared)
+    - stats: dict that receives the search counters (see search_stats), also
+      when the search is cut short by an exception
+    The deadline is checked on a monotonic clock every CHECK_EVERY flips.
     """
-    start = time.time()
-    pos_occ, neg_occ = build_occurrences(n, clauses)
+    start = time.monotonic()
+    deadline = start + time_limit
+    if rng is None:
+        rng = random.Random()
+    n, m = inst.n, inst.m
+    target = inst.total_weight
 
     best_assign = None
     best_score = -1
     history = []
+    stale_restarts = 0
+    restart_index = 0
+    noise = p_random_walk
+    stagnation_flips = max(1, int(ADAPT_THETA * m))
+    # telemetry: flips of finished restarts, greedy / noise steps
+    flips = 0
+    flips_done = 0
+    greedy_steps = 0
+    random_steps = 0
 
-    # keep running until time limit
-    while time.time() - start < time_limit:
-        # random restart
-        assign = initial_assignment(n)
-        true_count, sat = evaluate_initial_true_counts(clauses, assign)
-        if sat > best_score:
-            best_score = sat
-            best_assign = assign.copy()
-            history.append((time.time()-start, best_score))
-            if best_score == m:
+    try:
+        # keep running until time limit
+        while time.monotonic() < deadline:
+            if shared is not None and shared.stop.is_set():
                 break
+            true_count = None
+            if shared is not None and stall_restarts and stale_restarts >= stall_restarts:
+                # stalled: continue from the best assignment any worker has found
+                stale_restarts = 0
+                global_score, assign = shared.snapshot()
+                if global_score < 0:
+                    assign = initial_assignment(n, rng)
+            else:
+                # fresh restart (best of restart_samples draws of the init method)
+                base = None
+                if init == "perturb":
+                    base_score, base = (shared.snapshot() if shared is not None
+                                        else (best_score, best_assign))
+                    if base_score < 0:
+                        base = None
+                assign, true_count, sat = sample_restart(inst, restart_samples, rng, init, base)
+            stale_restarts += 1
+            if true_count is None:
+                true_count, sat = evaluate_initial_true_counts(inst, assign)
+            unsat, unsat_pos = build_unsat_index(true_count)
+            if sat > best_score:
+                best_score = sat
+                best_assign = assign.copy()
+                history.append((time.monotonic()-start, best_score))
+                stale_restarts = 0
+                if shared is not None:
+                    shared.publish(best_score, best_assign)
+                if best_score == target:
+                    break
 
-        flips = 0
-        # central loop for this restart
-        while flips < max_flips_per_try and (time.time() - start < time_limit):
-            if sat == m:
-                # perfect assignment
+            flips_done += flips
+            flips = 0
+            flip_limit = restart_length(restart_schedule, max_flips_per_try, restart_index)
+            restart_index += 1
+            adapt_sat = sat
+            adapt_flip = 0
+            # central loop for this restart
+            while flips < flip_limit:
+                if sat == target:
+                    # perfect assignment
+                    if sat > best_score:
+                        best_score = sat
+                        best_assign = assign.copy()
+                        history.append((time.monotonic()-start, best_score))
+                        if shared is not None:
+                            shared.publish(best_score, best_assign)
+                    return best_score, best_assign, history
+                if flips % CHECK_EVERY == 0:
+                    if time.monotonic() >= deadline:
+                        break
+                    if shared is not None and shared.stop.is_set():
+                        return best_score, best_assign, history
+
+                # pick unsatisfied clause uniformly from the incrementally
+                # maintained unsatisfied set (O(1) regardless of how many are left)
+                chosen_clause_index = unsat[rng.randrange(len(unsat))]
+
+                lits = inst.clause(chosen_clause_index)
+                # with prob noise (p_random_walk unless adaptive) flip a random var from clause
+                if rng.random() < noise:
+                    best_var = abs(rng.choice(lits))
+                    random_steps += 1
+                else:
+                    # choose variable in clause that gives best gain (max increase in
+                    # satisfied clauses)
+                    best_var = None
+                    best_gain = -10**9
+                    for lit in lits:
+                        var = abs(lit)
+                        gain = compute_flip_gain(var, inst, assign, true_count)
+                        if gain > best_gain:
+                            best_gain = gain
+                            best_var = var
+                    greedy_steps += 1
+                sat += do_flip(best_var, assign, true_count, inst, unsat, unsat_pos)
+
+                flips += 1
+                if adaptive:
+                    if sat > adapt_sat:
+                        noise -= noise * ADAPT_PHI / 2
+                        adapt_sat = sat
+                        adapt_flip = flips
+                    elif flips - adapt_flip > stagnation_flips:
+                        noise += (1 - noise) * ADAPT_PHI
+                        adapt_sat = sat
+                        adapt_flip = flips
+
+                # record best
                 if sat > best_score:
                     best_score = sat
                     best_assign = assign.copy()
-                    history.append((time.time()-start, best_score))
-                return best_score, best_assign, history
-
-            # pick unsatisfied clause uniformly
-            # we can sample by scanning for a random unsatisfied clause; since clauses are small,
-            # this is acceptable. To avoid O(m) scan every time, we do one cheap sample attempt:
-            # pick a random clause and check if unsatisfied; try up to 5 times, else scan collect unsat list once.
-            chosen_clause_index = None
-            for _ in range(5):
-                ci = random.randrange(m)
-                if true_count[ci] == 0:
-                    chosen_clause_index = ci
+                    history.append((time.monotonic()-start, best_score))
+                    stale_restarts = 0
+                    if shared is not None:
+                        shared.publish(best_score, best_assign)
+                    if best_score == target:
+                        return best_score, best_assign, history
+
+            # end of restart, continue if time remains
+        return best_score, best_assign, history
+    finally:
+        if stats is not None:
+            stats.update(search_stats(
+                "walksat", time.monotonic() - start, flips_done + flips, history,
+                restarts=restart_index, greedy_steps=greedy_steps, random_steps=random_steps,
+                final_noise=round(noise, 4)))
+
+# clause-weighting engine (PAWS-style, Thornton et al. 2004)
+FLAT_MOVE_PROB = 0.15    # take a sideways (gain 0) move instead of adding weight
+WEIGHT_WALK_PROB = 0.01  # random-walk step at a local minimum
+SMOOTH_PERIOD = 2        # weight increases between two smoothing passes
+
+def adjust_weight(ci, amount, weight, true_count, crit, make, brk, inst):
+    """Change weight[ci] by amount and keep the weighted make/brk tables in sync."""
+    cnt = true_count[ci]
+    if cnt == 0:
+        lits = inst.lits
+        k = 3*ci
+        make[abs(lits[k])] += amount
+        make[abs(lits[k+1])] += amount
+        make[abs(lits[k+2])] += amount
+    elif cnt == 1:
+        brk[crit[ci]] += amount
+    weight[ci] += amount
+
+def clause_weighting_anytime(inst, time_limit=1.0, rng=None, shared=None, restart_samples=1,
+                             flat_prob=FLAT_MOVE_PROB, walk_prob=WEIGHT_WALK_PROB,
+                             smooth_period=SMOOTH_PERIOD, init="random", stats=None):
+    """
+    Dynamic clause-weighting local search (PAWS-style) on an Instance.
+    Every clause starts at its instance weight (1 if unweighted) and flips
+    are scored by weighted make - break. An improving flip in a random
+    unsatisfied clause is taken when there is one (a sideways one with prob
+    flat_prob); otherwise we are at a local minimum and every unsatisfied
+    clause gets +1 weight, so the landscape changes under the search
+    instead of throwing the assignment away with a restart. Every
+    smooth_period increases, all raised weights drop by 1 so old minima are
+    forgotten. Same arguments, stats and return value
+    as walk_sat_anytime where they overlap.
+    """
+    start = time.monotonic()
+    deadline = start + time_limit
+    if rng is None:
+        rng = random.Random()
+    m = inst.m
+    target = inst.total_weight
+
+    # dynamic weights start from the clause weights of the instance
+    weight = array('i', [1]) * m if inst.weights is None else array('i', inst.weights)
+    heavy = set()  # clauses above their base weight, the only ones smoothing touches
+    assign, _, _ = sample_restart(inst, restart_samples, rng, init)
+    true_count, crit, make, brk, sat = build_score_tables(inst, assign, weight)
+    unsat, unsat_pos = build_unsat_index(true_count)
+
+    best_score = sat
+    best_assign = assign.copy()
+    history = [(time.monotonic()-start, best_score)]
+    if shared is not None:
+        shared.publish(best_score, best_assign)
+    increases = 0
+    steps = 0
+    greedy_steps = 0
+    random_steps = 0
+
+    try:
+        while sat < target:
+            if steps % CHECK_EVERY == 0:
+                if time.monotonic() >= deadline:
                     break
-            if chosen_clause_index is None:
-                # fallback: scan to build unsatisfied list
-                unsat = [i for i in range(m) if true_count[i] == 0]
-                if not unsat:
-                    # all satisfied
-                    if sat > best_score:
-                        best_score = sat
-                        best_assign = assign.copy()
-                        history.append((time.time()-start, best_score))
+                if shared is not None and shared.stop.is_set():
                     break
-                chosen_clause_index = random.choice(unsat)
+            steps += 1
 
-            a,b,c = clauses[chosen_clause_index]
-            lits = (a,b,c)
-            # with prob p_random_walk flip a random var from clause
-            if random.random() < p_random_walk:
-                lit = random.choice(lits)
+            lits = inst.clause(unsat[rng.randrange(len(unsat))])
+            best_var = None
+            best_gain = None
+            for lit in lits:
                 var = abs(lit)
-                delta = do_flip(var, assign, true_count, clauses, pos_occ, neg_occ)
-                sat += delta
+                gain = make[var] - brk[var]
+                if best_gain is None or gain > best_gain:
+                    best_gain = gain
+                    best_var = var
+
+            if best_gain > 0 or (best_gain == 0 and rng.random() < flat_prob):
+                var = best_var
+                greedy_steps += 1
+            elif rng.random() < walk_prob:
+                var = abs(rng.choice(lits))
+                random_steps += 1
             else:
-                # choose variable in clause that gives best gain (max increase in satisfied clauses)
-                best_var = None
-                best_gain = -10**9
-                for lit in lits:
-                    var = abs(lit)
-                    gain = compute_flip_gain(var, clauses, assign, true_count, pos_occ, neg_occ)
-                    if gain > best_gain:
-                        best_gain = gain
-                        best_var = var
-                # tie-breaker randomness
-                if best_var is None:
-                    best_var = abs(random.choice(lits))
-                    best_gain = compute_flip_gain(best_var, clauses, assign, true_count, pos_occ, neg_occ)
-                delta = do_flip(best_var, assign, true_count, clauses, pos_occ, neg_occ)
-                sat += delta
-
-            flips += 1
-
-            # record best
+                # local minimum: make the clauses that are still unsatisfied heavier
+                for ci in unsat:
+                    adjust_weight(ci, 1, weight, true_count, crit, make, brk, inst)
+                    heavy.add(ci)
+                increases += 1
+                if increases % smooth_period == 0:
+                    for ci in list(heavy):
+                        adjust_weight(ci, -1, weight, true_count, crit, make, brk, inst)
+                        if weight[ci] == inst.weight(ci):
+                            heavy.discard(ci)
+                continue
+
+            sat += do_flip_scored(var, assign, true_count, crit, make, brk, inst, unsat,
+                                  unsat_pos, weight)
             if sat > best_score:
                 best_score = sat
                 best_assign = assign.copy()
-                history.append((time.time()-start, best_score))
-                if best_score == m:
-                    return best_score, best_assign, history
+                history.append((time.monotonic()-start, best_score))
+                if shared is not None:
+                    shared.publish(best_score, best_assign)
+
+        return best_score, best_assign, history
+    finally:
+        if stats is not None:
+            stats.update(search_stats(
+                "weights", time.monotonic() - start, greedy_steps + random_steps, history,
+                restarts=0, greedy_steps=greedy_steps, random_steps=random_steps,
+                weight_increases=increases, smoothings=increases // smooth_period))
+
+ENGINES = {"walksat": walk_sat_anytime, "weights": clause_weighting_anytime}
+
+def run_search(inst, engine="walksat", **opts):
+    """Run the local search engine named engine (see ENGINES) with its options."""
+    return ENGINES[engine](inst, **opts)
+
+# assignment bytes (0/1) -> "F"/"T" characters
+TF_TABLE = bytes.maketrans(b"\x00\x01", b"FT")
+
+class ImprovementLog:
+    """
+    --stream: one JSON line {"time", "score"[, "assign"]} per new best,
+    flushed right away, in terms of the original instance (preprocessing
+    offset added, assignment restored). SharedBest.publish formats the line
+    before taking its lock and writes it under the lock, so lines from
+    several workers never interleave and the lock is not held while a big
+    assignment is restored.
+    """
+    def __init__(self, path, offset=0, restore=None, with_assign=False):
+        self.path = path
+        self.offset = offset
+        self.restore = restore
+        self.with_assign = with_assign
+        self.start = time.monotonic()
+        self.f = sys.stderr if path == "-" else open(path, "w")
+
+    def __getstate__(self):
+        # a spawned worker reopens the file (appending) instead of pickling it
+        state = dict(self.__dict__)
+        state["f"] = None
+        return state
+
+    def line(self, score, assign):
+        """The JSON line for a new best (score, assign)."""
+        record = {"time": round(time.monotonic() - self.start, 4), "score": score + self.offset}
+        if self.with_assign:
+            full = self.restore(assign) if self.restore is not None else assign
+            record["assign"] = bytes(full[1:]).translate(TF_TABLE).decode()
+        return json.dumps(record) + "\n"
 
-        # end of restart, continue if time remains
-    return best_score, best_assign, history
+    def write(self, line):
+        if self.f is None:
+            self.f = sys.stderr if self.path == "-" else open(self.path, "a")
+        self.f.write(line)
+        self.f.flush()
 
-def worker(n, m, clauses, time_limit, conn):
-    score, assign, _ = walk_sat_anytime(n, m, clauses, time_limit=time_limit)
-    conn.send((score, assign))
-    conn.close()
+LOCK_TIMEOUT = 1.0  # seconds SharedBest.snapshot waits for the lock
+
+class SharedBest:
+    """
+    Best score and assignment of the search, kept in shared memory so every
+    worker of a -p run publishes into it and main() can read it back, also
+    when the run is interrupted. stop is set as soon as any worker reaches
+    target (the total weight, or a proven upper bound once lower_target has
+    been called) so the others can quit early. With a log, every new best
+    is also streamed out (see ImprovementLog). The assignment is kept as
+    a bitset (index 0 included), 1/8 of the bytes of the search's arrays.
+    """
+    def __init__(self, n, target, log=None):
+        self.n = n
+        self.score = Value('i', -1)
+        self.assign = Array('B', bitset_size(n+1), lock=False)
+        self.stop = Event()
+        self.target = Value('q', target, lock=False)
+        self.log = log
+
+    def publish(self, score, assign):
+        """Store (score, assign) if it beats the global best. Return True if it did."""
+        if score <= self.score.value:
+            return False
+        # the slow parts (packing, restoring a --stream-assign line) before locking
+        packed = pack_bits(assign)
+        line = self.log.line(score, assign) if self.log is not None else None
+        with self.score.get_lock():
+            if score <= self.score.value:
+                return False
+            # one memcpy; slice assignment on the ctypes array goes item by item
+            memoryview(self.assign).cast('B')[:] = packed
+            self.score.value = score
+            if line is not None:
+                self.log.write(line)
+        if score >= self.target.value:
+            self.stop.set()
+        return True
+
+    def lower_target(self, bound):
+        """Take a new upper bound as the target; stop everyone if it is already met."""
+        with self.score.get_lock():
+            self.target.value = min(self.target.value, bound)
+            reached = self.score.value >= self.target.value
+        if reached:
+            self.stop.set()
+
+    def snapshot(self):
+        """
+        Return (score, assign copy) of the global best; score is -1 if none
+        yet. If the lock is not free within LOCK_TIMEOUT seconds (its holder
+        was killed) the values are read anyway: the score may then not
+        match the assignment, so an interrupted main() rescores it.
+        """
+        lock = self.score.get_lock()
+        locked = lock.acquire(timeout=LOCK_TIMEOUT)
+        try:
+            # get_obj(): .value itself would wait for the lock again
+            score = self.score.get_obj().value
+            packed = bytes(memoryview(self.assign).cast('B'))
+        finally:
+            if locked:
+                lock.release()
+        return score, unpack_bits(packed, self.n+1)
+
+# per-worker search settings for --portfolio, handed out round-robin. They
+# override the command line search options when the engine matches and
+# replace them otherwise.
+PORTFOLIO_CONFIGS = [
+    {"engine": "walksat", "p_random_walk": 0.4, "max_flips_per_try": 1000, "stall_restarts": 20},
+    {"engine": "weights"},
+    {"engine": "walksat", "adaptive": True, "restart_schedule": "luby", "stall_restarts": 10},
+    {"engine": "walksat", "p_random_walk": 0.2, "max_flips_per_try": 10000, "stall_restarts": 5},
+    {"engine": "walksat", "p_random_walk": 0.5, "max_flips_per_try": 100000, "stall_restarts": 2},
+    {"engine": "walksat", "adaptive": True, "restart_schedule": "geometric"},
+]
+
+def portfolio_options(search_opts, config):
+    """Search options of a portfolio worker: config layered over the command line ones."""
+    if config["engine"] != search_opts["engine"]:
+        return dict(config)
+    return {**search_opts, **config}
+
+class Interrupted(Exception):
+    """Raised by the SIGINT/SIGTERM handler to unwind main() out of the search."""
+
+def ignore_signals():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+def raise_interrupted(signum, frame):
+    # one is enough: a second signal must not cut the answer short
+    ignore_signals()
+    raise Interrupted(signum)
+
+def worker_signals():
+    # Ctrl-C or a scheduler's SIGTERM reaches the whole process group: leave
+    # it to main(), which collects the shared best and then kills the
+    # workers. A worker dying on it could hold the SharedBest lock.
+    ignore_signals()
+
+def worker(source, time_limit, search_opts, seed, worker_index, shared, stats_conn=None):
+    """
+    One -p search process on the SharedInstance / CachedInstance source; its counters go
+    back over stats_conn (--stats).
+    """
+    worker_signals()
+    inst = source.instance()
+    rng = worker_rng(seed, worker_index)
+    stats = {} if stats_conn is not None else None
+    run_search(inst, time_limit=time_limit, rng=rng, shared=shared, stats=stats, **search_opts)
+    if stats_conn is not None:
+        stats["worker"] = worker_index
+        stats["options"] = search_opts
+        stats_conn.send(stats)
+        stats_conn.close()
+
+# counters summed over the workers of a -p run in the --stats report
+STATS_TOTALS = ("flips", "flips_per_sec", "restarts", "greedy_steps", "random_steps",
+                "weight_increases", "smoothings")
+
+def stats_report(runs, offset):
+    """
+    Combine the search_stats of the single search or of every -p worker into
+    the --stats report body. Scores are shifted by offset (what preprocessing
+    satisfied up front) so they match the printed score.
+    """
+    for run in runs:
+        if run["best_score"] >= 0:
+            run["best_score"] += offset
+        run["history"] = [[t, score + offset] for t, score in run["history"]]
+    if len(runs) == 1:
+        return dict(runs[0])
+    report = {key: sum(run.get(key, 0) for run in runs) for key in STATS_TOTALS}
+    best = max((run["best_score"] for run in runs), default=-1)
+    # earliest moment any worker held the final best
+    report["best_score"] = best
+    report["time_to_best"] = min((t for run in runs for t, score in run["history"]
+                                  if score == best), default=None)
+    report["workers"] = runs
+    return report
+
+def write_stats(path, report):
+    text = json.dumps(report) + "\n"
+    if path == "-":
+        sys.stderr.write(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text)
+
+def bound_worker(source, time_limit, shared):
+    """--bound: tighten the shared target with disjoint-core upper bounds."""
+    worker_signals()
+    inst = source.instance()
+    core_bound(list(inst.clauses()), inst.weights, time_limit, on_bound=shared.lower_target)
+
+def write_result(score, assign, n):
+    """Print the score and one "i T/F" line per variable (the normal output)."""
+    lines = [str(score)]
+    lines.extend(f"{i} {'T' if assign[i] else 'F'}" for i in range(1, n+1))
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 def main():
     args = parse_args()
     filename = args.filename
-    # If not file specified, read from stdin
-    if filename == "-":
-        n, m, clauses = read_input()
+    setup_start = time.monotonic()
+    # search on the simplified instance, map the answer back at the end
+    compiled = None
+    if args.cache:
+        work, pre, compiled = load_cached(filename, args.cache,
+                                          simplify=not args.no_preprocess)
     else:
-        n, m, clauses = read_file(filename)
+        # If not file specified, read from stdin
+        if filename == "-":
+            inst = read_input()
+        else:
+            inst = read_file(filename)
+        pre = None
+        if not args.no_preprocess:
+            pre = preprocess(inst)
+            inst = None  # only the simplified copy is kept
+        work = inst if pre is None else pre.instance()
+    n = work.n if pre is None else pre.orig_n
 
     # Ensure parameters are valid
     time_limit = max(1, args.t)
     threads = max(1, args.p)
+    # without --seed, draw a fresh base seed so forked workers still differ
+    seed = args.seed if args.seed is not None else random.randrange(2**63)
+    search_opts = {
+        "engine": args.engine,
+        "restart_samples": max(1, args.restart_samples),
+        "init": args.init,
+    }
+    if args.engine == "walksat":
+        search_opts.update(adaptive=args.adaptive,
+                           restart_schedule=args.restarts)
 
-    if threads == 1:
-        best_score, best_assign, _ = walk_sat_anytime(n, m, clauses, time_limit=time_limit)
-    else:
-        processes = []
-        conns = []
-        for i in range(threads):
-            parent_conn, child_conn = Pipe()
-            p = Process(target=worker, args=(n, m, clauses, time_limit, child_conn))
-            p.start()
-            processes.append(p)
-            conns.append(parent_conn)
+    log = None
+    if args.stream:
+        log = ImprovementLog(args.stream, offset=pre.satisfied if pre is not None else 0,
+                             restore=pre.restore if pre is not None else None,
+                             with_assign=args.stream_assign)
+    # every improvement lands here, so an interrupted run still has its best
+    shared = SharedBest(work.n, target=work.total_weight, log=log)
+
+    runs = []  # search_stats of the search / of each worker, with --stats
+    processes = []
+    conns = []
+    interrupted = None
+    search_start = time.monotonic()
+    # child processes mmap the --cache file, or else attach to one shared
+    # copy, instead of each getting their own
+    source = None
+    if threads > 1 or args.bound:
+        source = CachedInstance(compiled) if compiled else SharedInstance(work)
+    bounder = None
+    if args.bound:
+        bounder = Process(target=bound_worker, args=(source, time_limit, shared))
+        bounder.start()
+    previous = {sig: signal.signal(sig, raise_interrupted)
+                for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        if threads == 1:
+            if args.stats:
+                runs.append({})
+            best_score, best_assign, _ = run_search(work, time_limit=time_limit,
+                                                    rng=worker_rng(seed, 0), shared=shared,
+                                                    stats=runs[0] if runs else None,
+                                                    **search_opts)
+        else:
+            for i in range(threads):
+                opts = search_opts
+                if args.portfolio:
+                    # cooperative workers: varied configs, stalled ones restart from the shared best
+                    opts = portfolio_options(search_opts,
+                                             PORTFOLIO_CONFIGS[i % len(PORTFOLIO_CONFIGS)])
+                stats_conn = None
+                if args.stats:
+                    conn, stats_conn = Pipe(duplex=False)
+                    conns.append(conn)
+                p = Process(target=worker, args=(source, time_limit, opts, seed, i, shared,
+                                                  stats_conn))
+                p.start()
+                processes.append(p)
+                if stats_conn is not None:
+                    stats_conn.close()
+
+            # receive before joining: a child blocks in send() until it is read
+            for conn in conns:
+                try:
+                    runs.append(conn.recv())
+                except EOFError:
+                    pass  # the worker died before reporting
+            for p in processes:
+                p.join()
 
+            best_score, best_assign = shared.snapshot()
+    except Interrupted as exc:
+        interrupted = exc.args[0]
+        best_score, best_assign = shared.snapshot()
+        # they ignore SIGTERM
+        for p in processes:
+            p.kill()
         for p in processes:
             p.join()
+    finally:
+        # from here on a signal no longer interrupts anything: finish and print
+        ignore_signals()
+        # only after the last snapshot: a killed bounder must not hold the lock
+        if bounder is not None:
+            bounder.kill()
+            bounder.join()
+        if source is not None:
+            source.unlink()
 
-        best_score = -1
+    if best_score < 0:
         best_assign = None
-        for conn in conns:
-            score, assign = conn.recv()
-            if score > best_score:
-                best_score = score
-                best_assign = assign
-
     # ensure we have an assignment (if none found, create a random one)
     if best_assign is None:
-        best_assign = initial_assignment(n)
+        best_assign = initial_assignment(work.n, worker_rng(seed, threads))
+    if interrupted is not None or best_score < 0:
+        # the signal may have landed between copying an assignment and its score
+        best_score = evaluate_initial_true_counts(work, best_assign)[1]
+    offset = pre.satisfied if pre is not None else 0
+    bound = shared.target.value + offset
+    if pre is not None:
+        best_score += pre.satisfied
+        best_assign = pre.restore(best_assign)
+
+    if args.stats:
+        report = {
+            "threads": threads,
+            "portfolio": args.portfolio and threads > 1,
+            "time_limit": time_limit,
+            "setup_time": round(search_start - setup_start, 4),
+            "search_time": round(time.monotonic() - search_start, 4),
+            "interrupted": interrupted is not None,
+            "score": best_score,
+            "preprocess_satisfied": offset,
+        }
+        if args.bound:
+            report["bound"] = bound
+            report["gap"] = bound - best_score
+        report.update(stats_report([run for run in runs if run], offset))
+        write_stats(args.stats, report)
 
-    print(best_score)
-    for i in range(1, n+1):
-        print(i, "T" if best_assign[i] else "F")
+    if args.bound:
+        gap = bound - best_score
+        sys.stderr.write(f"upper bound {bound}, gap {gap}{' (optimal)' if gap == 0 else ''}\n")
+    write_result(best_score, best_assign, n)
+    for sig, handler in previous.items():
+        signal.signal(sig, handler)
+    if interrupted is not None:
+        sys.exit(128 + interrupted)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,205 @@
+"""
+Upper bound on the Max-3-SAT optimum from disjoint inconsistent cores.
+
+A core is a set of clauses that no assignment satisfies together, so every
+assignment falsifies at least one clause of it. Cores that share no clause
+therefore cost one falsified clause each, and m - (number of disjoint
+cores) is an upper bound. Cores are found by a small DPLL solver: when it
+refutes the remaining clauses, the clauses falsified at its leaves plus the
+reason clauses of the unit propagations behind them form a core. The core
+is then shrunk (drop a clause, keep the drop if the rest is still
+unsatisfiable), taken out, and the search repeats until the remaining
+clauses are satisfiable or time runs out. With weights a core costs its
+lightest clause; that much weight is taken off every clause of the core
+and the heavier ones stay in for later cores.
+
+The bound is anytime: every core found tightens it, stopping early only
+leaves it looser.
+"""
+import time
+
+
+class Refuter:
+    """DPLL with unit propagation over a subset of clauses, collecting a core."""
+
+    def __init__(self, clauses, active):
+        self.clauses = clauses
+        self.active = active
+        self.occ = {}
+        for ci in active:
+            for lit in clauses[ci]:
+                self.occ.setdefault(lit, []).append(ci)
+        self.value = {}   # var -> bool
+        self.reason = {}  # var -> clause that forced it, None for a decision
+        self.trail = []
+        self.nsat = dict.fromkeys(active, 0)
+        self.nfalse = dict.fromkeys(active, 0)
+        self.core = set()
+
+    def assign(self, lit, why):
+        """Set lit true. Return (falsified clause or None, clauses that became unit)."""
+        var = abs(lit)
+        self.value[var] = lit > 0
+        self.reason[var] = why
+        self.trail.append(var)
+        for ci in self.occ.get(lit, ()):
+            self.nsat[ci] += 1
+        conflict = None
+        units = []
+        clauses = self.clauses
+        for ci in self.occ.get(-lit, ()):
+            self.nfalse[ci] += 1
+            if self.nsat[ci] == 0:
+                left = len(clauses[ci]) - self.nfalse[ci]
+                if left == 0:
+                    if conflict is None:
+                        conflict = ci
+                elif left == 1:
+                    units.append(ci)
+        return conflict, units
+
+    def propagate(self, queue):
+        value = self.value
+        while queue:
+            ci = queue.pop()
+            if self.nsat[ci]:
+                continue
+            free = [lit for lit in self.clauses[ci] if abs(lit) not in value]
+            if not free:
+                return ci
+            if len(free) > 1:
+                continue
+            conflict, units = self.assign(free[0], ci)
+            if conflict is not None:
+                return conflict
+            queue.extend(units)
+        return None
+
+    def decide(self, lit):
+        conflict, units = self.assign(lit, None)
+        if conflict is None:
+            conflict = self.propagate(units)
+        return conflict
+
+    def unassign_to(self, mark):
+        trail = self.trail
+        while len(trail) > mark:
+            var = trail.pop()
+            lit = var if self.value[var] else -var
+            for ci in self.occ.get(lit, ()):
+                self.nsat[ci] -= 1
+            for ci in self.occ.get(-lit, ()):
+                self.nfalse[ci] -= 1
+            del self.value[var]
+            del self.reason[var]
+
+    def explain(self, ci):
+        """Add the falsified clause ci and the reasons behind its literals to the core."""
+        stack = [ci]
+        seen = set()
+        while stack:
+            c = stack.pop()
+            if c in seen:
+                continue
+            seen.add(c)
+            self.core.add(c)
+            for lit in self.clauses[c]:
+                r = self.reason.get(abs(lit))
+                if r is not None:
+                    stack.append(r)
+
+    def refute(self, deadline):
+        """
+        Return a core (set of clause indices) if the active clauses are
+        unsatisfiable, None if they are satisfiable. Raises TimeoutError
+        past deadline (time.monotonic()).
+        """
+        occ = self.occ
+        order = sorted({abs(lit) for lit in occ},
+                       key=lambda v: -(len(occ.get(v, ())) + len(occ.get(-v, ()))))
+        conflict = self.propagate([ci for ci in self.active if len(self.clauses[ci]) == 1])
+        if conflict is not None:
+            self.explain(conflict)
+            return self.core
+
+        stack = []  # [var, trail mark, phase]; phase 0 tries var, 1 tries -var
+        nodes = 0
+        value = self.value
+        while True:
+            nodes += 1
+            if nodes % 256 == 0 and time.monotonic() > deadline:
+                raise TimeoutError
+            var = next((v for v in order if v not in value), None)
+            if var is None:
+                return None
+            stack.append([var, len(self.trail), 0])
+            conflict = self.decide(var)
+            while conflict is not None:
+                self.explain(conflict)
+                conflict = None
+                # backtrack to the deepest decision with an untried phase
+                while stack:
+                    frame = stack[-1]
+                    self.unassign_to(frame[1])
+                    if frame[2] == 0:
+                        frame[2] = 1
+                        conflict = self.decide(-frame[0])
+                        break
+                    stack.pop()
+                else:
+                    return self.core
+
+
+def refute(clauses, active, deadline):
+    """Core of clauses[active] if unsatisfiable, else None (see Refuter.refute)."""
+    return Refuter(clauses, active).refute(deadline)
+
+
+def shrink_core(clauses, core, deadline):
+    """Drop clauses from a core while the rest stays unsatisfiable (until deadline)."""
+    core = sorted(core)
+    i = 0
+    while i < len(core) and time.monotonic() < deadline:
+        trial = core[:i] + core[i+1:]
+        try:
+            smaller = refute(clauses, trial, deadline)
+        except TimeoutError:
+            break
+        if smaller is None:
+            i += 1  # needed
+        else:
+            core = sorted(smaller)
+    return core
+
+
+def core_bound(clauses, weights=None, time_limit=1.0, on_bound=None):
+    """
+    Upper bound on the satisfiable weight of clauses (literal tuples,
+    weights default 1). Returns (bound, cores found). on_bound(bound) is
+    called every time a core tightens the bound.
+    """
+    deadline = time.monotonic() + time_limit
+    clauses = [tuple(set(cl) - {0}) for cl in clauses]
+    weight = [1] * len(clauses) if weights is None else list(weights)
+    bound = sum(weight)
+    # tautologies are always satisfied, so they are never part of a core
+    active = [ci for ci, cl in enumerate(clauses)
+              if weight[ci] > 0 and not any(-lit in cl for lit in cl)]
+    cores = 0
+    while time.monotonic() < deadline:
+        try:
+            core = refute(clauses, active, deadline)
+        except TimeoutError:
+            break
+        if core is None:
+            break  # what is left is satisfiable
+        core = shrink_core(clauses, core, deadline)
+        cost = min(weight[ci] for ci in core)
+        for ci in core:
+            weight[ci] -= cost
+        active = [ci for ci in active if weight[ci] > 0]
+        bound -= cost
+        cores += 1
+        if on_bound is not None:
+            on_bound(bound)
+    return bound, cores
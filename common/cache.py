@@ -0,0 +1,161 @@
+"""
+Opt-in on-disk cache of compiled instances.
+
+Parsing (and preprocessing) a large text instance costs far more than
+reading it, so the compiled Instance arrays are written once to a binary
+file named after the SHA-256 of the input bytes. Later runs mmap that file
+and build the Instance directly on memoryviews of it: nothing is parsed or
+copied. Worker processes get a CachedInstance (the file's path) and mmap
+the same file themselves, so they all share its pages in the OS page cache.
+
+File layout: an 8-byte magic, a little-endian header of int64 fields,
+then native int32 / byte sections each starting on an 8-byte boundary:
+lits, tautology, occ_start, occ, weights, and for a preprocessed instance
+var_map, fixed variables and their values.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from instance import Instance
+from loader import parse, read_bytes
+from preprocess import Preprocessed, preprocess
+
+MAGIC = b"M3SATC1\0"
+# bump when the loader, preprocessing or file layout changes meaning
+FORMAT_VERSION = 1
+# n, m, total_weight, has_weights, occ length, preprocessed, orig_n,
+# satisfied, number of fixed variables
+HEADER = struct.Struct("<9q")
+
+
+def cache_key(data, simplify):
+    """File name for the compiled form of the input bytes data."""
+    digest = hashlib.sha256(data).hexdigest()
+    kind = "pre" if simplify else "raw"
+    return f"{digest}.{kind}.v{FORMAT_VERSION}.m3c"
+
+
+def compile_data(data, simplify=True):
+    """
+    Parse (and by default preprocess) input bytes.
+    Returns (inst, pre): pre is the Preprocessed that maps inst's answers
+    back to the input, or None when simplify is False.
+    """
+    n, lits, weights = parse(data)
+    inst = Instance(n, lits, weights)
+    if not simplify:
+        return inst, None
+    pre = preprocess(inst)
+    del inst  # only the simplified copy is kept
+    return pre.instance(), pre
+
+
+def _sections(inst, pre):
+    weights = inst.weights if inst.weights is not None else array('i')
+    if pre is None:
+        var_map = fixed_vars = fixed_vals = array('i')
+    else:
+        var_map = array('i', pre.var_map)
+        fixed_vars = array('i', pre.fixed.keys())
+        fixed_vals = array('i', pre.fixed.values())
+    return [inst.lits, inst.tautology, inst.occ_start, inst.occ, weights,
+            var_map, fixed_vars, fixed_vals]
+
+
+def write_compiled(path, inst, pre=None):
+    """Write inst (and its Preprocessed mapping) to path atomically."""
+    header = HEADER.pack(inst.n, inst.m, inst.total_weight,
+                         inst.weights is not None, len(inst.occ),
+                         pre is not None,
+                         pre.orig_n if pre is not None else inst.n,
+                         pre.satisfied if pre is not None else 0,
+                         len(pre.fixed) if pre is not None else 0)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(header)
+            for section in _sections(inst, pre):
+                raw = bytes(section)
+                f.write(raw)
+                f.write(b"\0" * (-len(raw) % 8))
+        os.chmod(tmp, 0o644)  # mkstemp makes it private; others may share the cache
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_compiled(path):
+    """mmap a file written by write_compiled and return (inst, pre)."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buf)
+    if view[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: not a compiled instance")
+    (n, m, total_weight, has_weights, occ_len, simplified, orig_n,
+     satisfied, n_fixed) = HEADER.unpack_from(view, len(MAGIC))
+    offset = len(MAGIC) + HEADER.size
+
+    def take(count, fmt):
+        nonlocal offset
+        size = count * (4 if fmt == 'i' else 1)
+        if offset + size > len(view):
+            raise ValueError(f"{path}: truncated")
+        part = view[offset:offset + size].cast(fmt)
+        offset += size + (-size % 8)
+        return part
+
+    lits = take(3*m, 'i')
+    tautology = take(m, 'B')
+    occ_start = take(2*n + 3, 'i')
+    occ = take(occ_len, 'i')
+    weights = take(m if has_weights else 0, 'i')
+    inst = Instance.from_arrays(n, lits, tautology, occ_start, occ,
+                                weights if has_weights else None, total_weight)
+    if not simplified:
+        return inst, None
+    var_map = take(n + 1, 'i')
+    fixed = dict(zip(take(n_fixed, 'i'), take(n_fixed, 'i')))
+    return inst, Preprocessed(orig_n, n, None, None, satisfied, var_map, fixed)
+
+
+def load_cached(source, cache_dir, simplify=True):
+    """
+    compile_data() for a file name ("-" for stdin), reusing the compiled
+    file in cache_dir when one exists for the same input bytes.
+    Returns (inst, pre, path of the compiled file).
+    """
+    data = read_bytes(source)
+    path = os.path.join(cache_dir, cache_key(data, simplify))
+    if os.path.exists(path):
+        try:
+            return read_compiled(path) + (path,)
+        except (ValueError, struct.error):
+            pass  # truncated or foreign file: rebuild it below
+    inst, pre = compile_data(data, simplify)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_compiled(path, inst, pre)
+    return inst, pre, path
+
+
+class CachedInstance:
+    """
+    A compiled file handed to worker processes in place of the instance:
+    it pickles as its path and instance() mmaps the file, so every worker
+    reads the same page-cache pages and nothing is copied. Same interface
+    as shared.SharedInstance; unlink() leaves the file in the cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def instance(self):
+        return read_compiled(self.path)[0]
+
+    def unlink(self):
+        pass
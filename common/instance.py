@@ -0,0 +1,201 @@
+"""
+Compact array-backed Max-3-SAT instance shared by the solvers.
+
+Clauses live in one flat array('i') of 3*m literals instead of a list of
+tuples, and the clauses each literal occurs in are kept CSR-style (one
+offsets array plus one flat clause-index array), so an instance costs a few
+dozen bytes per clause and no per-clause Python objects.
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # normalized and indexed one clause at a time, ~10x slower
+    np = None
+
+INDEX_CHUNK = 1 << 20  # literals per step when adding positions to the sort keys
+
+
+def lit_code(lit):
+    """Index of a literal in the occurrence offsets: 2v for v, 2v+1 for -v."""
+    return 2*lit if lit > 0 else 1 - 2*lit
+
+
+class Instance:
+    """
+    n variables (1..n), m clauses of 3 literals.
+    - lits: array('i') of length 3m, clause i is lits[3i:3i+3]. A literal
+      repeated inside a clause is stored once and the freed slot is 0
+      (x v x v y is stored as x, 0, y), which does not change the clause.
+    - tautology: bytearray(m), 1 for clauses containing x and -x; these are
+      satisfied by every assignment and are left out of the occurrence index.
+    - occ_start/occ: CSR occurrence index. The clauses containing literal
+      lit are occ[occ_start[c]:occ_start[c+1]] with c = lit_code(lit); every
+      clause is listed at most once per literal.
+    - weights: None (every clause counts 1) or array('i') of m clause
+      weights, e.g. duplicate clauses merged by preprocessing.
+    """
+
+    def __init__(self, n, lits, weights=None):
+        if len(lits) % 3:
+            raise ValueError("literal array length must be a multiple of 3")
+        self.n = n
+        self.m = len(lits) // 3
+        self.lits = array('i', lits)
+        if weights is not None:
+            weights = array('i', weights)
+            if len(weights) != self.m:
+                raise ValueError("need one weight per clause")
+        self.weights = weights
+        self.total_weight = self.m if weights is None else sum(weights)
+        self.tautology = bytearray(self.m)
+        if np is not None and self.m:
+            self.occ_start, self.occ = self._index_numpy()
+        else:
+            self._normalize()
+            self.occ_start, self.occ = self._build_occurrences()
+
+    @classmethod
+    def from_clauses(cls, n, clauses, weights=None):
+        """Build from an iterable of (a, b, c) literal triples."""
+        lits = array('i')
+        for cl in clauses:
+            lits.extend(cl)
+        return cls(n, lits, weights)
+
+    @classmethod
+    def from_arrays(cls, n, lits, tautology, occ_start, occ, weights=None, total_weight=None):
+        """
+        Wrap already normalized arrays (e.g. memoryviews of a compiled cache
+        file) without copying or re-validating them.
+        """
+        inst = cls.__new__(cls)
+        inst.n = n
+        inst.m = len(lits) // 3
+        inst.lits = lits
+        inst.weights = weights
+        if total_weight is None:
+            total_weight = inst.m if weights is None else sum(weights)
+        inst.total_weight = total_weight
+        inst.tautology = tautology
+        inst.occ_start = occ_start
+        inst.occ = occ
+        return inst
+
+    def _normalize(self):
+        lits = self.lits
+        n = self.n
+        for i in range(self.m):
+            a, b, c = lits[3*i], lits[3*i+1], lits[3*i+2]
+            for lit in (a, b, c):
+                if lit == 0 or abs(lit) > n:
+                    raise ValueError(f"clause {i+1}: literal {lit} out of range 1..{n}")
+            if a == -b or a == -c or b == -c:
+                self.tautology[i] = 1
+                continue
+            if c == a or c == b:
+                lits[3*i+2] = 0
+            if b == a:
+                lits[3*i+1] = 0
+
+    def _build_occurrences(self):
+        lits = self.lits
+        tautology = self.tautology
+        counts = array('i', [0]) * (2*self.n+3)
+        for i in range(self.m):
+            if tautology[i]:
+                continue
+            for lit in lits[3*i:3*i+3]:
+                if lit:
+                    counts[lit_code(lit)+1] += 1
+        for c in range(1, len(counts)):
+            counts[c] += counts[c-1]
+        occ_start = counts
+        fill = array('i', occ_start)
+        occ = array('i', [0]) * occ_start[-1]
+        for i in range(self.m):
+            if tautology[i]:
+                continue
+            for lit in lits[3*i:3*i+3]:
+                if lit:
+                    c = lit_code(lit)
+                    occ[fill[c]] = i
+                    fill[c] += 1
+        return occ_start, occ
+
+    def _index_numpy(self):
+        """
+        _normalize() and _build_occurrences() as whole-array operations,
+        keeping the temporaries to a few bytes per literal.
+        """
+        n = self.n
+        rows = np.frombuffer(self.lits, dtype=np.int32).reshape(-1, 3)
+        bad = (rows == 0) | (rows > n) | (rows < -n)
+        if bad.any():
+            i = int(np.flatnonzero(bad.any(axis=1))[0])
+            lit = int(rows[i][bad[i]][0])
+            raise ValueError(f"clause {i+1}: literal {lit} out of range 1..{n}")
+        del bad
+        a, b, c = rows[:, 0], rows[:, 1], rows[:, 2]
+        tautology = (a == -b) | (a == -c) | (b == -c)
+        keep = ~tautology
+        c[keep & ((c == a) | (c == b))] = 0
+        b[keep & (b == a)] = 0
+        self.tautology[:] = tautology.astype(np.uint8).tobytes()
+
+        # lit_code of every literal in place, 0 for padding and tautologies
+        codes = rows.copy()
+        codes[tautology] = 0
+        codes = codes.ravel()
+        negative = codes < 0
+        codes *= 2
+        codes[negative] = 1 - codes[negative]
+        del negative
+        counts = np.bincount(codes, minlength=2*n + 2)
+        skip = int(counts[0])
+        counts[0] = 0
+        occ_start = np.zeros(2*n + 3, dtype=np.int32)
+        np.cumsum(counts, out=occ_start[1:])
+        # sort code * 3m + position in place: grouped by literal, each
+        # literal's clauses in increasing order; the 0 codes come first
+        size = len(codes)
+        order = codes.astype(np.int64)
+        del codes
+        order *= size
+        for start in range(0, size, INDEX_CHUNK):
+            stop = min(start + INDEX_CHUNK, size)
+            order[start:stop] += np.arange(start, stop, dtype=np.int64)
+        order.sort()
+        order = order[skip:]
+        order %= size
+        order //= 3
+        occ = array('i', [0]) * len(order)
+        np.frombuffer(occ, dtype=np.int32)[:] = order
+        occ_start_arr = array('i', [0]) * len(occ_start)
+        np.frombuffer(occ_start_arr, dtype=np.int32)[:] = occ_start
+        return occ_start_arr, occ
+
+    def weight(self, ci):
+        return 1 if self.weights is None else self.weights[ci]
+
+    def clause(self, ci):
+        """Distinct literals of clause ci (0 padding removed)."""
+        return [lit for lit in self.lits[3*ci:3*ci+3] if lit]
+
+    def clauses(self):
+        """Yield every clause as a list of its distinct literals."""
+        for ci in range(self.m):
+            yield self.clause(ci)
+
+    def occurrences(self, lit):
+        """Clause indices containing lit, as an array('i') slice."""
+        c = lit_code(lit)
+        return self.occ[self.occ_start[c]:self.occ_start[c+1]]
+
+    def pos_occ(self, var):
+        c = 2*var
+        return self.occ[self.occ_start[c]:self.occ_start[c+1]]
+
+    def neg_occ(self, var):
+        c = 2*var + 1
+        return self.occ[self.occ_start[c]:self.occ_start[c+1]]
@@ -0,0 +1,150 @@
+"""
+One loader for every Max-3-SAT input the solvers accept.
+
+The whole input is read in one go, decompressed if it is gzip (detected
+from the magic bytes, so it works for stdin too) and all integers are
+parsed in a single pass into a flat array, instead of a readline/split per
+clause. Accepted formats:
+- the project format: "n m" then m lines of 3 literals;
+- DIMACS CNF: "c" comment lines, "p cnf n m", clauses terminated by 0;
+- DIMACS WCNF: "p wcnf n m [top]", each clause starts with its weight.
+  Hard clauses (weight >= top) are kept with weight top, which already
+  outweighs all soft clauses together.
+DIMACS clauses may have 1 to 3 literals; shorter ones are padded by
+repeating a literal, which does not change the clause.
+"""
+import gzip
+import sys
+import warnings
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # plain split/int parsing, ~7x slower on big inputs
+    np = None
+
+from instance import Instance
+
+
+def read_bytes(source):
+    """Raw bytes of a file name ("-" means stdin), gunzipped if needed."""
+    if source == "-":
+        data = sys.stdin.buffer.read()
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return data
+
+
+def parse_ints(data):
+    """All whitespace separated integers of data (bytes) as an array('i')."""
+    if np is not None:
+        try:
+            with warnings.catch_warnings():
+                # numpy only warns (and stops early) on a bad token
+                warnings.simplefilter("error")
+                values = np.fromstring(data, dtype=np.int64, sep=" ")
+            # written straight into the array: no int32 / bytes copies in between
+            out = array('i', [0]) * len(values)
+            np.frombuffer(out, dtype=np.int32)[:] = values
+            return out
+        except (ValueError, DeprecationWarning):
+            pass  # let int() below report the offending token
+    return array('i', map(int, data.split()))
+
+
+def _split_dimacs(data):
+    """Return (header tokens of the p line, body bytes) of a DIMACS input."""
+    header = None
+    body = []
+    for line in data.split(b"\n"):
+        stripped = line.strip()
+        if not stripped or stripped[:1] == b"c":
+            continue
+        if stripped[:1] == b"%":  # SATLIB files end with "%\n0"
+            break
+        if stripped[:1] == b"p":
+            if header is not None:
+                raise ValueError("more than one p line")
+            header = stripped.split()
+            continue
+        body.append(line)
+    return header, b"\n".join(body)
+
+
+def _dimacs_clauses(n, m, ints, weighted, top):
+    lits = array('i')
+    weights = array('i') if weighted else None
+    clause = []
+    i = 0
+    count = len(ints)
+    while i < count:
+        if weighted and not clause:
+            w = ints[i]
+            i += 1
+            if i >= count:
+                break
+            weights.append(min(w, top) if top else w)
+        lit = ints[i]
+        i += 1
+        if lit:
+            clause.append(lit)
+            continue
+        if not 1 <= len(clause) <= 3:
+            raise ValueError(f"clause {len(lits)//3 + 1}: {len(clause)} literals, "
+                             "only 1 to 3 are supported")
+        while len(clause) < 3:
+            clause.append(clause[-1])
+        lits.extend(clause)
+        clause = []
+    if clause:
+        raise ValueError("last clause is not terminated by 0")
+    if len(lits) // 3 != m:
+        raise ValueError(f"header says {m} clauses, found {len(lits)//3}")
+    return n, lits, weights
+
+
+def parse(data):
+    """
+    Parse an instance from bytes in any accepted format.
+    Returns (n, lits, weights): lits is an array('i') of 3m literals and
+    weights an array('i') of m clause weights, or None when unweighted.
+    """
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    first = data.lstrip()[:1]
+    if first in (b"c", b"p"):
+        header, body = _split_dimacs(data)
+        if header is None or len(header) < 4 or header[1] not in (b"cnf", b"wcnf"):
+            raise ValueError("expected a 'p cnf n m' or 'p wcnf n m [top]' line")
+        weighted = header[1] == b"wcnf"
+        n, m = int(header[2]), int(header[3])
+        top = int(header[4]) if weighted and len(header) > 4 else 0
+        return _dimacs_clauses(n, m, parse_ints(body), weighted, top)
+
+    ints = parse_ints(data)
+    if len(ints) < 2:
+        raise ValueError("expected an 'n m' header")
+    n, m = ints[0], ints[1]
+    if len(ints) < 2 + 3*m:
+        raise ValueError(f"header says {m} clauses, found {(len(ints) - 2) // 3}")
+    return n, ints[2:2 + 3*m], None
+
+
+def load(source):
+    """parse() a file name ("-" for stdin)."""
+    return parse(read_bytes(source))
+
+
+def load_instance(source):
+    """Load a file name ("-" for stdin) straight into an Instance."""
+    n, lits, weights = load(source)
+    return Instance(n, lits, weights)
+
+
+def triples(lits):
+    """Flat literal array -> list of (a, b, c) clause tuples."""
+    it = iter(lits)
+    return list(zip(it, it, it))
@@ -0,0 +1,236 @@
+"""
+Instance simplification shared by the Max-3-SAT solvers.
+
+Before a solver runs, the raw clause list is shrunk without changing the
+optimum:
+- tautologies (x v -x v y) are satisfied by every assignment and dropped;
+- duplicate clauses are merged into one clause whose weight is the number
+  of copies;
+- pure literals (a variable that only occurs with one sign) are set to
+  satisfy all their clauses, which never costs a clause, and those clauses
+  are dropped; this repeats until no pure literal is left;
+- variables that no longer occur are dropped and the rest renumbered 1..n'.
+
+The solver then works on n' variables and weighted clauses, and
+Preprocessed.restore / Preprocessed.satisfied map its answer back to the
+original variables and score.
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # clauses merged one at a time, slower
+    np = None
+
+from instance import Instance, lit_code
+
+
+class Preprocessed:
+    """
+    Result of preprocess().
+    - n, lits, weights: the simplified weighted instance in the new
+      numbering, as a flat array('i') of 3m literals (shorter clauses
+      repeat a literal) and an array('i') of m weights. A Preprocessed
+      read back from the instance cache only keeps the mapping: lits and
+      weights are None, use the cached Instance.
+    - satisfied: weight of the original clauses that are satisfied no
+      matter what the solver does (tautologies and pure-literal clauses);
+      original score = solver's weighted score + satisfied.
+    - orig_n: variable count of the original instance.
+    - var_map: var_map[v] is the original variable of new variable v
+      (index 0 unused).
+    - fixed: original variable -> value forced by pure-literal elimination.
+    """
+
+    def __init__(self, orig_n, n, lits, weights, satisfied, var_map, fixed):
+        self.orig_n = orig_n
+        self.n = n
+        self.lits = lits
+        self.weights = weights
+        self.satisfied = satisfied
+        self.var_map = var_map
+        self.fixed = fixed
+
+    @property
+    def m(self):
+        return len(self.lits) // 3
+
+    @property
+    def clauses(self):
+        """The simplified clauses as a list of 3-tuples (small instances)."""
+        it = iter(self.lits)
+        return list(zip(it, it, it))
+
+    def instance(self):
+        """The simplified instance as a weighted Instance."""
+        return Instance(self.n, self.lits, self.weights)
+
+    def restore(self, assign):
+        """
+        Map an assignment of the simplified instance (indexable 1..n) to a
+        bytearray of 0/1 over the original variables (index 0 unused).
+        Dropped unused variables are set to 0 (False).
+        """
+        full = bytearray(self.orig_n + 1)
+        for var, value in self.fixed.items():
+            full[var] = value
+        for v in range(1, self.n + 1):
+            full[self.var_map[v]] = 1 if assign[v] else 0
+        return full
+
+
+def _merge_numpy(lits, alive, new_index, base, weights):
+    """merge_alive() with whole-array NumPy operations."""
+    mask = np.frombuffer(alive, dtype=np.uint8).astype(bool)
+    rows = np.frombuffer(lits, dtype=np.int32).reshape(-1, 3)[mask]
+    negative = rows < 0
+    np.abs(rows, out=rows)
+    renamed = np.frombuffer(new_index, dtype=np.int32)[rows]
+    del rows
+    np.negative(renamed, out=renamed, where=negative)
+    del negative
+    # 0 padding sorts last, then repeats the literal before it
+    padding = np.iinfo(np.int32).max
+    renamed[renamed == 0] = padding
+    renamed.sort(axis=1)
+    for col in (1, 2):
+        gap = renamed[:, col] == padding
+        renamed[gap, col] = renamed[gap, col - 1]
+    count = len(renamed)
+    keys = np.zeros(count, dtype=np.int64)
+    for col in range(3):
+        lit = renamed[:, col]
+        keys *= base
+        keys += 2 * np.abs(lit) + (lit < 0)  # lit_code
+    # stable sort: the first of each run of equal keys is its lowest index
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.empty(count, dtype=bool)
+    starts[:1] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=starts[1:])
+    first = np.empty(count, dtype=np.int64)
+    first[order] = order[starts][np.cumsum(starts) - 1]
+    del keys, order, sorted_keys, starts
+    if weights is None:
+        alive_weights = np.ones(count, dtype=np.int64)
+    else:
+        alive_weights = np.frombuffer(weights, dtype=np.int32)[mask]
+    merged = np.bincount(first, weights=alive_weights, minlength=count).astype(np.int32)
+    keep = first == np.arange(count)
+    kept = int(keep.sum())
+    out_lits = array('i', [0]) * (3 * kept)
+    out_weights = array('i', [0]) * kept
+    np.frombuffer(out_lits, dtype=np.int32).reshape(-1, 3)[:] = renamed[keep]
+    np.frombuffer(out_weights, dtype=np.int32)[:] = merged[keep]
+    return out_lits, out_weights
+
+
+def _merge_python(lits, alive, new_index, base, weights):
+    """merge_alive() one clause at a time."""
+    keys = []
+    kept = array('i')
+    canon = array('i')
+    for ci in range(len(alive)):
+        if not alive[ci]:
+            continue
+        renamed = sorted(new_index[lit] if lit > 0 else -new_index[-lit]
+                         for lit in lits[3*ci:3*ci + 3] if lit)
+        while len(renamed) < 3:
+            renamed.append(renamed[-1])
+        a, b, c = [2*lit if lit > 0 else 1 - 2*lit for lit in renamed]
+        keys.append((a * base + b) * base + c)
+        canon.extend(renamed)
+        kept.append(ci)
+    first = array('i', range(len(keys)))
+    previous_key = previous = None
+    for k in sorted(range(len(keys)), key=keys.__getitem__):
+        if keys[k] == previous_key:
+            first[k] = previous
+        else:
+            previous_key, previous = keys[k], k
+    del keys
+    merged = array('i', [0]) * len(kept)
+    for k, ci in enumerate(kept):
+        merged[first[k]] += 1 if weights is None else weights[ci]
+    out_lits, out_weights = array('i'), array('i')
+    for k in range(len(kept)):
+        if first[k] == k:
+            out_lits.extend(canon[3*k:3*k + 3])
+            out_weights.append(merged[k])
+    return out_lits, out_weights
+
+
+def merge_alive(lits, alive, new_index, new_n, weights):
+    """
+    The clauses with alive[ci] set, renumbered by new_index, literals
+    sorted and padded by repeating the last one, and duplicates merged into
+    their first copy by sorting one integer key per clause (its three
+    literal codes). Returns (lits, weights) arrays of the merged clauses.
+    """
+    base = 2*new_n + 2
+    if np is not None and base**3 < 2**63:
+        return _merge_numpy(lits, alive, new_index, base, weights)
+    return _merge_python(lits, alive, new_index, base, weights)
+
+
+def preprocess(inst):
+    """
+    Simplify an Instance and return a Preprocessed. Works on the instance's
+    flat arrays: tautologies are already flagged, literal counts come from
+    the occurrence index, and duplicates are found by sorting one integer
+    key per clause (merge_alive), so no Python object is kept per clause.
+    """
+    n, m = inst.n, inst.m
+    lits = inst.lits
+    occ_start, occ = inst.occ_start, inst.occ
+    weights = inst.weights
+
+    def weight(ci):
+        return 1 if weights is None else weights[ci]
+
+    # tautologies are satisfied by every assignment
+    alive = bytearray(b"\x01") * m
+    satisfied = 0
+    for ci in range(m):
+        if inst.tautology[ci]:
+            alive[ci] = 0
+            satisfied += weight(ci)
+
+    # pure literal elimination, worklist driven; count[lit_code(lit)] is the
+    # number of alive clauses containing lit (duplicate clauses included)
+    count = array('i', [0]) * len(occ_start)
+    for c in range(len(occ_start) - 1):
+        count[c] = occ_start[c + 1] - occ_start[c]
+    fixed = {}
+    pending = [v for v in range(1, n + 1) if (count[2*v] == 0) != (count[2*v + 1] == 0)]
+    while pending:
+        v = pending.pop()
+        if v in fixed or (count[2*v] == 0) == (count[2*v + 1] == 0):
+            continue
+        value = 1 if count[2*v] else 0
+        fixed[v] = value
+        c = 2*v if value else 2*v + 1
+        for ci in occ[occ_start[c]:occ_start[c + 1]]:
+            if not alive[ci]:
+                continue
+            alive[ci] = 0
+            satisfied += weight(ci)
+            for lit in lits[3*ci:3*ci + 3]:
+                if not lit:
+                    continue
+                count[lit_code(lit)] -= 1
+                u = abs(lit)
+                if u not in fixed and (count[2*u] == 0) != (count[2*u + 1] == 0):
+                    pending.append(u)
+
+    # renumber the variables that still occur
+    new_index = array('i', [0]) * (n + 1)
+    var_map = array('i', [0])
+    for v in range(1, n + 1):
+        if v not in fixed and (count[2*v] or count[2*v + 1]):
+            var_map.append(v)
+            new_index[v] = len(var_map) - 1
+    new_n = len(var_map) - 1
+
+    out_lits, out_weights = merge_alive(lits, alive, new_index, new_n, weights)
+    return Preprocessed(n, new_n, out_lits, out_weights, satisfied, var_map, fixed)
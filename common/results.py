@@ -0,0 +1,70 @@
+"""
+Opt-in on-disk store of solver results for driver.py.
+
+A full driver run re-solves every test case even when neither the inputs
+nor the solvers changed, and the exact solves take most of that time. Each
+finished solver run is kept as a small JSON file (its stdout with the score
+and assignment, stderr, return code and the time it took) named after the
+SHA-256 of everything that determines it: the solver's options, the input
+bytes and the solver version. The version is a hash of the solver script
+and of the common/ modules, so editing a solver (or anything it imports
+from here) gives new keys and its old entries are simply never read again.
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+COMMON_DIR = os.path.dirname(os.path.abspath(__file__))
+# bump when the entry layout changes meaning
+FORMAT_VERSION = 1
+
+_versions = {}
+
+
+def source_version(script):
+    """SHA-256 of script plus the common/*.py modules every solver shares."""
+    script = os.path.abspath(script)
+    if script not in _versions:
+        digest = hashlib.sha256()
+        for path in [script] + sorted(glob.glob(os.path.join(COMMON_DIR, "*.py"))):
+            with open(path, "rb") as f:
+                digest.update(os.path.basename(path).encode() + b"\0" + f.read() + b"\0")
+        _versions[script] = digest.hexdigest()
+    return _versions[script]
+
+
+def result_key(script, options, data):
+    """
+    File name for a run of script with the list of string options on the
+    input bytes data (the instance file or whatever goes to stdin).
+    """
+    digest = hashlib.sha256()
+    digest.update(source_version(script).encode())
+    digest.update(json.dumps(options).encode())
+    digest.update(hashlib.sha256(data).digest())
+    return f"{digest.hexdigest()}.v{FORMAT_VERSION}.json"
+
+
+def load_result(store_dir, key):
+    """The entry stored under key, or None."""
+    try:
+        with open(os.path.join(store_dir, key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # missing, or a half-written / foreign file
+
+
+def save_result(store_dir, key, entry):
+    """Write the dict entry under key atomically."""
+    os.makedirs(store_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, os.path.join(store_dir, key))
+    except BaseException:
+        os.unlink(tmp)
+        raise
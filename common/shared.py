@@ -0,0 +1,104 @@
+"""
+Instances and assignments in shared memory for multi-process solvers.
+
+A -p run used to hand every worker its own copy of the instance: fine
+with fork (copy-on-write pages) but a full pickle per worker with the
+spawn/forkserver start methods, and a cached instance (memoryviews of an
+mmap) cannot be pickled at all. SharedInstance copies the instance arrays
+once into a multiprocessing.shared_memory block; it pickles as the block
+name plus the section layout, and a worker attaches to the block and
+builds an Instance on memoryviews of it without copying.
+
+Assignments go back as bitsets, one bit per variable instead of one byte
+(pack_bits / unpack_bits).
+"""
+import struct
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:  # bit packing through a binary string, ~25x slower
+    np = None
+
+from instance import Instance
+
+_TO_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+_FROM_CHARS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def bitset_size(count):
+    """Bytes needed for count bits."""
+    return (count + 7) // 8
+
+
+def pack_bits(values):
+    """0/1 bytes-like values -> bytes with one bit per value, first value in the top bit."""
+    if not values:
+        return b""
+    if np is not None:
+        return np.packbits(np.frombuffer(values, dtype=np.uint8)).tobytes()
+    # pad to whole bytes so the first value lands in the top bit
+    bits = bytes(values).translate(_TO_CHARS) + b"0" * (-len(values) % 8)
+    return int(bits, 2).to_bytes(bitset_size(len(values)), "big")
+
+
+def unpack_bits(packed, count):
+    """Inverse of pack_bits: a bytearray of count 0/1 values."""
+    if not count:
+        return bytearray()
+    if np is not None:
+        return bytearray(np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=count))
+    bits = format(int.from_bytes(packed, "big"), f"0{8 * len(packed)}b")
+    return bytearray(bits[:count].encode().translate(_FROM_CHARS))
+
+
+class SharedInstance:
+    """
+    An Instance's arrays (lits, tautology, occ_start, occ and the weights)
+    in one shared memory block. Create it in the parent, pass it to the
+    worker processes and call instance() there; the parent calls unlink()
+    once the workers are done.
+    """
+
+    def __init__(self, inst):
+        self.n = inst.n
+        self.total_weight = inst.total_weight
+        self.weighted = inst.weights is not None
+        sections = [inst.lits, inst.tautology, inst.occ_start, inst.occ]
+        if self.weighted:
+            sections.append(inst.weights)
+        # (offset, length in items, format) per section, 8-byte aligned
+        self.layout = []
+        offset = 0
+        for section in sections:
+            view = memoryview(section)
+            self.layout.append((offset, len(view), view.format))
+            offset += view.nbytes + (-view.nbytes % 8)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for section, (start, _, _) in zip(sections, self.layout):
+            raw = memoryview(section).cast('B')
+            self.shm.buf[start:start + len(raw)] = raw
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["shm"] = self.shm.name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=state["shm"])
+
+    def instance(self):
+        """An Instance on memoryviews of the block (no copy)."""
+        views = []
+        for start, count, fmt in self.layout:
+            size = count * struct.calcsize(fmt)
+            views.append(self.shm.buf[start:start + size].cast(fmt))
+        weights = views[4] if self.weighted else None
+        return Instance.from_arrays(self.n, views[0], views[1], views[2], views[3],
+                                    weights, self.total_weight)
+
+    def unlink(self):
+        """Release the block; instance() views must no longer be in use."""
+        self.shm.close()
+        self.shm.unlink()
@@ -1,13 +1,7 @@
 #!/usr/bin/env python3
-import sys, time, itertools
+import sys, time
 
-def clause_sat(clause, assignment):
-    a, b, c = clause
-    return (
-        (a > 0 and assignment[a-1]) or (a < 0 and not assignment[-a-1]) or
-        (b > 0 and assignment[b-1]) or (b < 0 and not assignment[-b-1]) or
-        (c > 0 and assignment[c-1]) or (c < 0 and not assignment[-c-1])
-    )
+from exact import branch_and_bound, local_search
 
 def main():
     data = sys.stdin.read().strip().split()
@@ -21,17 +15,20 @@ def main():
         idx += 3
         clauses.append((a, b, c))
 
-    best_val = -1
-    best_assignment = None
-    
-    for a in itertools.product([False, True], repeat=n):
-        val = sum(clause_sat(c, a) for c in clauses)
-        if val > best_val:
-            best_val = val
-            best_assignment = a
+    # same branch and bound as exact.py, on the raw clauses (no preprocessing)
+    work = []
+    for c in clauses:
+        lits = tuple(dict.fromkeys(c))
+        if not any(-lit in lits for lit in lits):
+            work.append(lits)
+    tautologies = m - len(work)
+    weights = [1] * len(work)
+    seed_val, seed_assign = local_search(n, work, weights)
+    best_val, best_assignment = branch_and_bound(n, work, weights, seed_val, seed_assign)
+    best_val += tautologies
 
     print(best_val)
-    for i, val in enumerate(best_assignment, start=1):
+    for i, val in enumerate(best_assignment[1:], start=1):
         print(f"{i} {'T' if val else 'F'}")
 
 if __name__ == "__main__":
@@ -1,33 +1,588 @@
 #!/usr/bin/env python3
-import sys, time, itertools
+import argparse, os, sys, time, random
+from multiprocessing import Pool, Value
 
-def clause_sat(clause, assignment):
-    a, b, c = clause
-    return (
-        (a > 0 and assignment[a-1]) or (a < 0 and not assignment[-a-1]) or
-        (b > 0 and assignment[b-1]) or (b < 0 and not assignment[-b-1]) or
-        (c > 0 and assignment[c-1]) or (c < 0 and not assignment[-c-1])
-    )
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+from bound import core_bound
+from instance import Instance
+from loader import load, triples
+from preprocess import preprocess
+
+SEED_FLIPS = 20000  # WalkSAT flips for the starting incumbent
+SEED_NOISE = 0.3    # probability of a random (instead of min-break) flip
+SHARED_CHECK = 1024 # branch and bound nodes between reads of the shared best
+PARALLEL_MIN_VARS = 20  # -p: smaller components are searched in the main process
+
+def occurrence_lists(n, clauses):
+    """pos[v] / neg[v]: indices of the clauses containing v / -v."""
+    pos = [[] for _ in range(n + 1)]
+    neg = [[] for _ in range(n + 1)]
+    for ci, cl in enumerate(clauses):
+        for lit in cl:
+            (pos if lit > 0 else neg)[abs(lit)].append(ci)
+    return pos, neg
+
+def local_search(n, clauses, weights, flips=SEED_FLIPS, rng=None):
+    """
+    Short WalkSAT run for a good first incumbent.
+    Returns (weight satisfied, assignment list indexed 1..n of 0/1).
+    """
+    rng = rng or random.Random(0)
+    pos, neg = occurrence_lists(n, clauses)
+    assign = [0] + [rng.randrange(2) for _ in range(n)]
+    true_count = [sum(1 for lit in cl if (lit > 0) == bool(assign[abs(lit)])) for cl in clauses]
+    unsat = [ci for ci, k in enumerate(true_count) if k == 0]
+    unsat_pos = {ci: i for i, ci in enumerate(unsat)}
+    lost = sum(weights[ci] for ci in unsat)
+    best_lost, best_assign = lost, assign[:]
+
+    def breaks(v):
+        # weight of the clauses that only v currently satisfies
+        occ = pos[v] if assign[v] else neg[v]
+        return sum(weights[ci] for ci in occ if true_count[ci] == 1)
+
+    for _ in range(flips):
+        if not unsat:
+            break
+        cl = clauses[unsat[rng.randrange(len(unsat))]]
+        if rng.random() < SEED_NOISE:
+            v = abs(cl[rng.randrange(len(cl))])
+        else:
+            v = min((abs(lit) for lit in cl), key=breaks)
+        made, broken = (neg[v], pos[v]) if assign[v] else (pos[v], neg[v])
+        assign[v] ^= 1
+        for ci in made:
+            true_count[ci] += 1
+            if true_count[ci] == 1:
+                lost -= weights[ci]
+                # O(1) removal: move the last entry into the hole
+                i = unsat_pos.pop(ci)
+                last = unsat.pop()
+                if last != ci:
+                    unsat[i] = last
+                    unsat_pos[last] = i
+        for ci in broken:
+            true_count[ci] -= 1
+            if true_count[ci] == 0:
+                lost += weights[ci]
+                unsat_pos[ci] = len(unsat)
+                unsat.append(ci)
+        if lost < best_lost:
+            best_lost, best_assign = lost, assign[:]
+    return sum(weights) - best_lost, best_assign
+
+DEADLINE_CHECK = 4096  # Gray-code steps between clock reads
+BOUND_SHARE = 0.1      # of -t, kept for the core upper bound when the search does not finish
+
+def new_progress():
+    """
+    Coverage record filled in by the searches (their progress argument),
+    summed over the parts of a split search:
+    - explored / space: assignments covered so far / in total;
+    - bound: upper bound on the best weight in the space (the best found
+      when the search completed);
+    - complete: False if any part stopped at its deadline.
+    """
+    return {"explored": 0, "space": 0, "bound": 0, "complete": True}
+
+def update_progress(progress, explored, space, bound, complete):
+    """Add one searched part to progress; parts of one space keep the max bound."""
+    progress["explored"] += explored
+    progress["space"] += space
+    progress["bound"] = max(progress["bound"], bound)
+    progress["complete"] = progress["complete"] and complete
+
+def branch_and_bound(n, clauses, weights, best_val=-1, best_assign=None, prefix=(),
+                     shared=None, deadline=None, progress=None):
+    """
+    Exact weighted MaxSAT by depth-first branch and bound.
+    Variables are assigned one at a time, most occurring first, trying the
+    incumbent's value first. Kept up to date along the way:
+    - lost: weight of the clauses already falsified (all literals false);
+    - unit[lit]: weight of the open clauses whose only unassigned literal
+      is lit. Either x or -x will be false, so every unassigned variable
+      adds min(unit[x], unit[-x]) more falsified weight (star).
+    A branch is cut as soon as total - lost - star cannot beat the
+    incumbent (best_val, best_assign).
+    - prefix: (var, value) pairs fixed before the search, which then only
+      covers that part of the space (one task of a -p run);
+    - shared: multiprocessing Value with the best weight any worker has
+      found; it is raised on every new incumbent and read every
+      SHARED_CHECK nodes to prune with;
+    - deadline: time.monotonic() value, also checked every SHARED_CHECK
+      nodes; past it the search stops with what it has;
+    - progress: dict that receives the search's coverage (see
+      new_progress), an upper bound included when it was cut short.
+    Returns (best weight satisfied, assignment list indexed 1..n of 0/1),
+    still (best_val, best_assign) when nothing better was found. The shared
+    value only raises the bar: a -p task passes best_val=-1, so it returns
+    -1 unless it reached an assignment of its own.
+    """
+    total = sum(weights)
+    pos, neg = occurrence_lists(n, clauses)
+    fixed = dict(prefix)
+    order = [v for v, _ in prefix] + sorted(
+        (v for v in range(1, n + 1) if v not in fixed),
+        key=lambda v: -(len(pos[v]) + len(neg[v])))
+    if best_assign is None:
+        best_assign = [0] * (n + 1)
+    first = best_assign[:]
+    for v, val in prefix:
+        first[v] = val
+    free = [len(cl) for cl in clauses]  # unassigned literals per clause
+    nsat = [0] * len(clauses)           # true literals per clause
+    value = [0] * (n + 1)
+    assigned = [False] * (n + 1)
+    tried = [0] * (n + 1)               # values tried so far at each depth
+    unit_pos = [0] * (n + 1)
+    unit_neg = [0] * (n + 1)
+    lost = 0
+    star = 0
+
+    def bump(lit, w):
+        # unit[lit] += w, keeping star in step
+        nonlocal star
+        v = abs(lit)
+        old = min(unit_pos[v], unit_neg[v])
+        if lit > 0:
+            unit_pos[v] += w
+        else:
+            unit_neg[v] += w
+        star += min(unit_pos[v], unit_neg[v]) - old
+
+    def free_lit(ci):
+        for lit in clauses[ci]:
+            if not assigned[abs(lit)]:
+                return lit
+
+    for ci, cl in enumerate(clauses):
+        if len(cl) == 1:
+            bump(cl[0], weights[ci])
+
+    bar = best_val  # what a branch has to beat: own or shared best
+    if shared is not None:
+        bar = max(bar, shared.value)
+    ceiling = [0] * (n + 1)  # total - lost - star before setting the variable of each depth
+    explored = 0             # assignments covered by finished or pruned subtrees
+    nodes = 0
+    timed_out = False
+    depth = 0
+    while depth >= 0:
+        nodes += 1
+        if nodes % SHARED_CHECK == 0:
+            if shared is not None and shared.value > bar:
+                bar = shared.value
+            if deadline is not None and time.monotonic() > deadline:
+                timed_out = True
+                break
+        if depth == n:
+            # every variable set and not pruned: a new incumbent
+            explored += 1
+            best_val = bar = total - lost
+            best_assign = value[:]
+            if shared is not None:
+                with shared.get_lock():
+                    if best_val > shared.value:
+                        shared.value = best_val
+            depth -= 1
+            continue
+        v = order[depth]
+        k = tried[depth]
+        if k:
+            # undo the previous value of v (v still counts as assigned for free_lit)
+            t = v if value[v] else -v
+            sat_occ, false_occ = (pos[v], neg[v]) if t > 0 else (neg[v], pos[v])
+            for ci in sat_occ:
+                nsat[ci] -= 1
+                free[ci] += 1
+                if not nsat[ci] and free[ci] == 1:
+                    bump(t, weights[ci])
+            for ci in false_occ:
+                if not nsat[ci]:
+                    if not free[ci]:
+                        lost -= weights[ci]
+                        bump(-t, weights[ci])
+                    elif free[ci] == 1:
+                        bump(free_lit(ci), -weights[ci])
+                free[ci] += 1
+            assigned[v] = False
+        if k == 2 or (k == 1 and depth < len(prefix)):
+            tried[depth] = 0
+            depth -= 1
+            continue
+        if k == 0:
+            ceiling[depth] = total - lost - star
+        val = first[v] if k == 0 else 1 - first[v]
+        tried[depth] = k + 1
+        value[v] = val
+        assigned[v] = True
+        t = v if val else -v
+        sat_occ, false_occ = (pos[v], neg[v]) if val else (neg[v], pos[v])
+        for ci in sat_occ:
+            if not nsat[ci] and free[ci] == 1:
+                bump(t, -weights[ci])
+            nsat[ci] += 1
+            free[ci] -= 1
+        for ci in false_occ:
+            free[ci] -= 1
+            if not nsat[ci]:
+                if not free[ci]:
+                    lost += weights[ci]
+                    bump(-t, -weights[ci])
+                elif free[ci] == 1:
+                    bump(free_lit(ci), weights[ci])
+        if total - lost - star > bar:
+            depth += 1
+        else:
+            # a cut inside the prefix still only covers this task's space
+            explored += 1 << (n - max(depth + 1, len(prefix)))
+    if progress is not None:
+        # what is left: the subtree under the current node and the untried
+        # second values above it, each bounded by its ceiling
+        bounds = [bar]
+        if timed_out:
+            if depth == n or tried[depth] == 0:
+                bounds.append(total - lost - star)
+            for d in range(len(prefix), min(depth + 1, n)):
+                if tried[d] == 1:
+                    bounds.append(ceiling[d])
+        update_progress(progress, explored, 1 << (n - len(prefix)), max(bounds), not timed_out)
+    return best_val, best_assign
+
+# per worker process of parallel_branch_and_bound, set by _init_pool
+_pool_state = None
+
+def _init_pool(n, clauses, weights, best_assign, shared, deadline):
+    global _pool_state
+    _pool_state = (n, clauses, weights, best_assign, shared, deadline)
+
+def _solve_prefix(prefix):
+    n, clauses, weights, best_assign, shared, deadline = _pool_state
+    progress = new_progress()
+    # the seed only orders the values tried; the shared best is the bar to beat
+    val, assign = branch_and_bound(n, clauses, weights, -1, best_assign, prefix,
+                                   shared, deadline, progress)
+    if val < 0:
+        return -1, None, progress
+    return val, assign, progress
+
+def parallel_branch_and_bound(n, clauses, weights, best_val, best_assign, processes,
+                              split_depth=None, deadline=None, progress=None):
+    """
+    branch_and_bound on a process pool. The split_depth most occurring
+    variables are fixed in all 2^split_depth ways (by default enough for
+    ~4 tasks per process), each combination is one task, and the workers
+    prune with a shared best score. A task only returns an assignment it
+    reached itself (else (-1, None)), so scores stay paired with their
+    assignments. Returns the best result of all tasks (or the incumbent
+    passed in, if none beat it); deadline and progress
+    as in branch_and_bound, summed over the tasks.
+    """
+    if split_depth is None:
+        split_depth = (4 * processes - 1).bit_length()
+    split_depth = min(split_depth, n)
+    occurrences = [0] * (n + 1)
+    for cl in clauses:
+        for lit in cl:
+            occurrences[abs(lit)] += 1
+    split_vars = sorted(range(1, n + 1), key=lambda v: -occurrences[v])[:split_depth]
+    tasks = [tuple((v, (i >> j) & 1) for j, v in enumerate(split_vars))
+             for i in range(1 << split_depth)]
+    shared = Value('q', best_val)
+    if progress is None:
+        progress = new_progress()
+    with Pool(processes, initializer=_init_pool,
+              initargs=(n, clauses, weights, best_assign, shared, deadline)) as pool:
+        for val, assign, task in pool.imap_unordered(_solve_prefix, tasks):
+            if assign is not None and val > best_val:
+                best_val, best_assign = val, assign
+            update_progress(progress, task["explored"], task["space"], task["bound"],
+                            task["complete"])
+    return best_val, best_assign
+
+def gray_code_search(n, clauses, weights, deadline=None, progress=None):
+    """
+    Exhaustive search in Gray-code order: step i flips the variable of the
+    lowest set bit of i, so consecutive assignments differ in one variable.
+    Per-clause true-literal counts and the satisfied weight are updated
+    from the flipped variable's occurrence lists only (like do_flip in
+    approx.py), O(m/n) per assignment instead of O(m). Bit k drives the
+    k-th least occurring variable, since low bits flip most often.
+    deadline / progress as in branch_and_bound; the steps not taken are
+    only bounded by the total weight.
+    Returns (best weight satisfied, assignment list indexed 1..n of 0/1).
+    """
+    pos, neg = occurrence_lists(n, clauses)
+    order = sorted(range(1, n + 1), key=lambda v: len(pos[v]) + len(neg[v]))
+    # flipped[k]: (occurrences made true, made false) by flipping order[k] 0->1, 1->0
+    flipped = [((pos[v], neg[v]), (neg[v], pos[v])) for v in order]
+    assign = [0] * (n + 1)
+    true_count = [sum(1 for lit in cl if lit < 0) for cl in clauses]
+    sat = sum(w for k, w in zip(true_count, weights) if k)
+    best_val, best_step = sat, 0
+    steps = 1 << n
+    for step in range(1, 1 << n):
+        if deadline is not None and step % DEADLINE_CHECK == 0 and time.monotonic() > deadline:
+            steps = step
+            break
+        k = (step & -step).bit_length() - 1
+        v = order[k]
+        made, broken = flipped[k][assign[v]]
+        assign[v] ^= 1
+        for ci in made:
+            true_count[ci] += 1
+            if true_count[ci] == 1:
+                sat += weights[ci]
+        for ci in broken:
+            true_count[ci] -= 1
+            if not true_count[ci]:
+                sat -= weights[ci]
+        if sat > best_val:
+            best_val, best_step = sat, step
+    if progress is not None:
+        complete = steps == 1 << n
+        update_progress(progress, steps, 1 << n, best_val if complete else sum(weights), complete)
+    # the assignment at step i is the Gray code i ^ (i >> 1)
+    gray = best_step ^ (best_step >> 1)
+    best_assign = [0] * (n + 1)
+    for k, v in enumerate(order):
+        best_assign[v] = (gray >> k) & 1
+    return best_val, best_assign
+
+BLOCK_BITS = 16  # bit-sliced search: 2^16 assignments per block
+
+def low_masks(bits):
+    """
+    Masks over a block of 2^bits assignments (bit a = assignment a), one
+    per low variable k: bit a is set iff bit k of a is 1.
+    """
+    size = 1 << bits
+    full = (1 << size) - 1
+    masks = []
+    for k in range(bits):
+        half = 1 << k
+        period = (1 << (2 * half)) - 1
+        # 2^k zeros then 2^k ones, repeated over the block
+        masks.append((((1 << half) - 1) << half) * (full // period))
+    return masks, full
+
+def add_to_counter(planes, mask, w):
+    """Add w to the bit-sliced counters of the assignments in mask."""
+    j = 0
+    while w:
+        if w & 1:
+            carry = mask
+            i = j
+            while carry:
+                t = planes[i] & carry
+                planes[i] ^= carry
+                carry = t
+                i += 1
+        w >>= 1
+        j += 1
+
+def bitsliced_search(n, clauses, weights, block_bits=BLOCK_BITS, deadline=None, progress=None):
+    """
+    Exhaustive search, one block of 2^block_bits assignments at a time.
+    Python ints are the bit vectors: each low variable is a mask over the
+    block, a clause is the OR of its literal masks, and the satisfied
+    weight of every assignment of the block lives in vertical (bit-sliced)
+    counters, so each clause costs a few big-int operations for the
+    whole block instead of one clause_sat call per assignment.
+    The high variables are fixed per block: a clause with a true high
+    literal adds its weight to every assignment of the block at once.
+    deadline (checked after every block) / progress as in gray_code_search.
+    Returns (best weight satisfied, assignment list indexed 1..n of 0/1).
+    """
+    bits = min(n, block_bits)
+    masks, full = low_masks(bits)
+    occurrences = [0] * (n + 1)
+    for cl in clauses:
+        for lit in cl:
+            occurrences[abs(lit)] += 1
+    # the most occurring variables go high: more clauses settled per block
+    order = sorted(range(1, n + 1), key=lambda v: occurrences[v])
+    low = {v: k for k, v in enumerate(order[:bits])}
+    high = order[bits:]
+    high_index = {v: k for k, v in enumerate(high)}
+    planes_needed = max(1, sum(weights).bit_length())
+
+    # per clause: OR of its low literal masks, high literals as (index, sign)
+    compiled = []
+    for cl, w in zip(clauses, weights):
+        mask = 0
+        high_lits = []
+        for lit in cl:
+            v = abs(lit)
+            if v in low:
+                mask |= masks[low[v]] if lit > 0 else full ^ masks[low[v]]
+            else:
+                high_lits.append((high_index[v], lit > 0))
+        compiled.append((mask, high_lits, w))
+
+    best_val = -1
+    best_assign = None
+    blocks = 1 << len(high)
+    for block in range(1 << len(high)):
+        offset = 0
+        planes = [0] * planes_needed
+        for mask, high_lits, w in compiled:
+            if any(((block >> k) & 1) == sign for k, sign in high_lits):
+                offset += w
+            elif mask:
+                add_to_counter(planes, mask, w)
+        # bit-sliced maximum: narrow down from the top plane
+        top = full
+        value = 0
+        for i in range(planes_needed - 1, -1, -1):
+            t = top & planes[i]
+            if t:
+                top = t
+                value |= 1 << i
+        if value + offset > best_val:
+            best_val = value + offset
+            a = (top & -top).bit_length() - 1  # first assignment of the block reaching it
+            best_assign = [0] * (n + 1)
+            for v, k in low.items():
+                best_assign[v] = (a >> k) & 1
+            for v, k in high_index.items():
+                best_assign[v] = (block >> k) & 1
+        if deadline is not None and time.monotonic() > deadline:
+            blocks = block + 1
+            break
+    if progress is not None:
+        complete = blocks == 1 << len(high)
+        update_progress(progress, blocks << bits, 1 << n,
+                        best_val if complete else sum(weights), complete)
+    return best_val, best_assign
+
+def components(n, clauses, weights):
+    """
+    Split the instance into independent parts: two variables belong
+    together when they share a clause (union-find). Returns a list of
+    (var_map, clauses, weights), one per connected component, with the
+    variables renumbered 1..k; var_map[i] is the original variable of i
+    (index 0 unused). Variables in no clause are left out.
+    """
+    parent = list(range(n + 1))
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for cl in clauses:
+        root = find(abs(cl[0]))
+        for lit in cl[1:]:
+            other = find(abs(lit))
+            if other != root:
+                parent[other] = root
+    groups = {}
+    for ci, cl in enumerate(clauses):
+        groups.setdefault(find(abs(cl[0])), []).append(ci)
+    parts = []
+    for members in groups.values():
+        var_map = [0] + sorted({abs(lit) for ci in members for lit in clauses[ci]})
+        index = {v: i for i, v in enumerate(var_map)}
+        sub = [tuple(index[lit] if lit > 0 else -index[-lit] for lit in clauses[ci])
+               for ci in members]
+        parts.append((var_map, sub, [weights[ci] for ci in members]))
+    return parts
+
+def satisfied_weight(clauses, weights, assign):
+    """Weight of the clauses assign (indexed 1..n, 0/1) satisfies."""
+    return sum(w for cl, w in zip(clauses, weights)
+               if any((lit > 0) == bool(assign[abs(lit)]) for lit in cl))
+
+def solve(method, n, clauses, weights, processes=1, split_depth=None, deadline=None,
+          progress=None):
+    """Run the --method search on one instance; -p only for bnb on big enough ones."""
+    if method == "bits":
+        return bitsliced_search(n, clauses, weights, deadline=deadline, progress=progress)
+    if method == "gray":
+        return gray_code_search(n, clauses, weights, deadline, progress)
+    seed_val, seed_assign = local_search(n, clauses, weights)
+    if processes > 1 and n >= PARALLEL_MIN_VARS:
+        return parallel_branch_and_bound(n, clauses, weights, seed_val, seed_assign,
+                                         processes, split_depth, deadline, progress)
+    return branch_and_bound(n, clauses, weights, seed_val, seed_assign,
+                            deadline=deadline, progress=progress)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exact Max-3-SAT solver")
+    parser.add_argument("--method", choices=("bnb", "bits", "gray"), default="bnb",
+                        help="bnb: branch and bound (default); bits: bit-sliced exhaustive "
+                             "search, 2^%d assignments per block; gray: exhaustive search "
+                             "in Gray-code order, one flip per assignment" % BLOCK_BITS)
+    parser.add_argument("-p", type=int, default=1,
+                        help="Worker processes for --method bnb: the space is split by fixing "
+                             "the first --split-depth variables (default 1, no split)")
+    parser.add_argument("--split-depth", type=int, default=None,
+                        help="Variables fixed per -p task (default: ~4 tasks per process)")
+    parser.add_argument("-t", type=float, default=None,
+                        help="Time limit in seconds: past it, print the best assignment found so "
+                             "far and report the explored fraction and an upper bound on stderr")
+    parser.add_argument("filename", help="instance file ('-' = stdin)")
+    args = parser.parse_args()
+    if args.p > 1 and args.method != "bnb":
+        parser.error("-p only applies to --method bnb")
+    return args
 
 def main():
-    path = sys.argv[1]
-    with open(path) as f:
-        n, m = map(int, f.readline().split())
-        clauses = [tuple(map(int, f.readline().split())) for _ in range(m)]
+    args = parse_args()
+    n, lits, weights = load(args.filename)
+    clauses = triples(lits)
 
     start = time.time()
+    deadline = None
+    if args.t is not None:
+        deadline = time.monotonic() + args.t * (1 - BOUND_SHARE)
+
+    # search only the variables left after simplification
+    pre = preprocess(Instance(n, lits, weights))
+    # repeated literals are padding, keep each one once
+    work = [tuple(dict.fromkeys(c)) for c in pre.clauses]
+
+    # independent parts are solved one by one: sum of 2^size instead of 2^n
+    best_val = 0
+    best_assignment = [0] * (pre.n + 1)
+    # the parts' optima add up, so do their upper bounds
+    explored = space = upper = 0
+    complete = True
+    for var_map, sub, sub_weights in components(pre.n, work, pre.weights):
+        progress = new_progress()
+        val, assign = solve(args.method, len(var_map) - 1, sub, sub_weights,
+                            args.p, args.split_depth, deadline, progress)
+        best_val += val
+        for i in range(1, len(var_map)):
+            best_assignment[var_map[i]] = assign[i]
+        explored += progress["explored"]
+        space += progress["space"]
+        upper += progress["bound"]
+        complete = complete and progress["complete"]
 
-    best_val = -1
-    best_assignment = None
-    
-    for a in itertools.product([False, True], repeat=n):
-        val = sum(clause_sat(c, a) for c in clauses)
-        if val > best_val:
-            best_val = val
-            best_assignment = a
-            
     runtime = time.time() - start
 
+    if not complete:
+        # the search's own bound is weak near the root, the cores help there
+        upper = min(upper, core_bound(work, pre.weights, args.t * BOUND_SHARE)[0])
+
+    best_val += pre.satisfied
+    best_assignment = pre.restore(best_assignment)
+    # the printed score must be what the printed assignment gets
+    reached = satisfied_weight(clauses, weights if weights is not None else [1] * len(clauses),
+                               best_assignment)
+    if reached != best_val:
+        sys.stderr.write(f"internal error: score {best_val} but the assignment "
+                         f"satisfies {reached}\n")
+        sys.exit(1)
+    best_assignment = best_assignment[1:]
+    if not complete:
+        # explored: share of the enumeration work, sum of 2^size over the parts
+        sys.stderr.write(f"time limit reached: explored {explored / space:.6f} of the search "
+                         f"space, upper bound {upper + pre.satisfied} (not proven optimal)\n")
+
     print(best_val)
     for i, val in enumerate(best_assignment, start=1):
         print(f"{i} {'T' if val else 'F'}")
@@ -3,12 +3,19 @@ import ast
 import csv
 import glob
 import os
+import re
+import signal
 import subprocess
 import sys
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+from loader import parse, read_bytes
+from results import load_result, result_key, save_result
+
 APPROX_TIME_LIMIT = 1  # seconds per Max-3-SAT approximation run
 MIS_TIME_LIMIT = 1     # seconds per MIS heuristic run
+EXACT_GRACE = 10       # seconds past exact.py's own -t before it is killed
 
 
 def run_process(command, *, input_data=None, timeout=None):
@@ -16,56 +23,121 @@ def run_process(command, *, input_data=None, timeout=None):
     Execute command, optionally providing stdin input_data. Returns tuple of
     (stdout, stderr, returncode, elapsed_seconds).
     A timeout (seconds) can be supplied to avoid runaway exact solves.
+    The command runs in its own session so that on a timeout its worker
+    processes (exact.py -p, approx.py -p) are killed along with it.
     """
     start = time.time()
+    proc = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if input_data is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    def kill():
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+
     try:
-        result = subprocess.run(
-            command,
-            input=input_data,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-        )
-        elapsed = time.time() - start
-        if result.returncode != 0:
-            sys.stderr.write(
-                f"[driver] Command {' '.join(command)} failed ({result.returncode}):\n"
-                f"{result.stderr}\n"
-            )
-        return result.stdout.strip(), result.stderr.strip(), result.returncode, elapsed
-    except subprocess.TimeoutExpired as exc:
+        stdout, stderr = proc.communicate(input_data, timeout=timeout)
+    except KeyboardInterrupt:
+        # the new session does not get the terminal's Ctrl-C, pass it on
+        kill()
+        raise
+    except subprocess.TimeoutExpired:
+        kill()
+        stdout, stderr = proc.communicate()
         elapsed = time.time() - start
         sys.stderr.write(
             f"[driver] Command {' '.join(command)} timed out after {timeout} seconds.\n"
         )
-        stdout = (exc.stdout or "").strip()
-        stderr = (exc.stderr or "timeout").strip()
-        return stdout, stderr, -1, elapsed
+        return (stdout or "").strip(), (stderr or "timeout").strip(), -1, elapsed
+    elapsed = time.time() - start
+    if proc.returncode != 0:
+        sys.stderr.write(
+            f"[driver] Command {' '.join(command)} failed ({proc.returncode}):\n"
+            f"{stderr}\n"
+        )
+    return stdout.strip(), stderr.strip(), proc.returncode, elapsed
 
 
-def parse_input_size(test_data):
+def run_solver(store, counts, script, options, *, instance=None, input_data=None, timeout=None):
     """
-    Return m (number of clauses) from the test case contents.
+    run_process(["python3", script, *options]) with the test case file
+    appended when instance = (path, bytes) is given, else input_data on
+    stdin. With a store directory a finished run (return code 0) is kept
+    there (common/results.py) and an identical later run (same solver
+    source, options and input bytes) returns the stored output and timing
+    instead of running again. counts tallies "stored" and "run" calls and
+    the original "stored_time" of the stored ones.
     """
-    first_line = test_data.strip().splitlines()
-    if not first_line:
-        return 0
-    tokens = first_line[0].split()
-    if len(tokens) < 2:
-        return 0
-    return int(tokens[1])
+    command = ["python3", script] + options
+    if instance is not None:
+        command.append(instance[0])
+    if store is None:
+        counts["run"] += 1
+        return run_process(command, input_data=input_data, timeout=timeout)
+    data = instance[1] if instance is not None else input_data.encode()
+    key = result_key(script, options, data)
+    entry = load_result(store, key)
+    if entry is not None:
+        counts["stored"] += 1
+        counts["stored_time"] += entry["elapsed"]
+        return entry["stdout"], entry["stderr"], entry["returncode"], entry["elapsed"]
+    counts["run"] += 1
+    stdout, stderr, returncode, elapsed = run_process(
+        command, input_data=input_data, timeout=timeout)
+    if returncode == 0:
+        save_result(store, key, {
+            "solver": os.path.basename(script),
+            "options": options,
+            "stdout": stdout,
+            "stderr": stderr,
+            "returncode": returncode,
+            "elapsed": elapsed,
+        })
+    return stdout, stderr, returncode, elapsed
+
 
-def parse_variable_count(test_data):
+def parse_instance_size(test_data):
     """
-    Return n (number of variables) from the test case contents.
+    Return (n, m) of the test case contents, in any format common/loader.py
+    reads; (0, 0) when it cannot be parsed.
     """
-    first_line = test_data.strip().splitlines()
-    if not first_line:
-        return 0
-    tokens = first_line[0].split()
-    if not tokens:
-        return 0
-    return int(tokens[0])
+    try:
+        n, lits, _ = parse(test_data)
+    except ValueError:
+        return 0, 0
+    return n, len(lits) // 3
+
+
+def parse_approx_bound(stderr):
+    """
+    approx.py --bound ends stderr with "upper bound B, gap G". Return B, or
+    None when the line is missing (e.g. the run failed).
+    """
+    for line in reversed(stderr.splitlines()):
+        if line.startswith("upper bound "):
+            try:
+                return int(line.split()[2].rstrip(","))
+            except (IndexError, ValueError):
+                return None
+    return None
+
+
+def parse_exact_progress(stderr):
+    """
+    exact.py -t reports an unfinished search on stderr as "... explored F
+    of the search space, upper bound B (not proven optimal)". Return
+    (F, B), or None when the search finished (the score is optimal).
+    """
+    match = re.search(r"explored ([0-9.]+) of the search space, upper bound (-?\d+)", stderr)
+    if match is None:
+        return None
+    return float(match.group(1)), int(match.group(2))
 
 
 def parse_mis_size(raw_output):
@@ -102,20 +174,40 @@ def main():
     parser.add_argument(
         "--max-exact-n",
         type=int,
-        default=22,
-        help="Run the exact solver only when n (variables) is at or below this threshold."
+        default=60,
+        help="Run the exact solver (branch and bound) only when n (variables) is at or below this threshold."
     )
     parser.add_argument(
         "--exact-timeout",
         type=float,
         default=20.0,
-        help="Seconds to allow the exact solver to run before skipping the result."
+        help="Seconds the exact solver gets (its -t); past that it reports its best so far, "
+             "how much it explored and an upper bound."
+    )
+    parser.add_argument(
+        "--exact-procs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for the exact solver (exact.py -p; default: all cores)."
     )
     parser.add_argument(
         "--skip-exact",
         action="store_true",
         help="Skip running the exact solver (only compute bounds/approximations)."
     )
+    parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        default=os.environ.get("MAX3SAT_CACHE"),
+        help="Let approx.py reuse compiled instances from DIR across runs (default: $MAX3SAT_CACHE)."
+    )
+    parser.add_argument(
+        "--store",
+        metavar="DIR",
+        default=os.environ.get("MAX3SAT_RESULTS"),
+        help="Keep solver results in DIR and reuse them while the instance, solver source and "
+             "options are unchanged (default: $MAX3SAT_RESULTS)."
+    )
     args = parser.parse_args()
     
     test_cases_dir = "test_cases"
@@ -133,6 +225,7 @@ def main():
         test_files = test_files[:args.num_tests]
     
     results = []
+    counts = {"stored": 0, "run": 0, "stored_time": 0.0}
     
     total_tests = len(glob.glob(os.path.join(test_cases_dir, "test_case*.txt")))
     print(f"Found {total_tests} total test cases. Running {len(test_files)} test case(s).")
@@ -147,16 +240,16 @@ def main():
     for test_file in test_files:
         case_name = os.path.basename(test_file)
         print(f"Processing {case_name}...")
-        with open(test_file, "r") as f:
-            test_data = f.read()
-        
-        m = parse_input_size(test_data)
-        n_vars = parse_variable_count(test_data)
+        # bytes, already gunzipped; the solvers get it as text on stdin
+        raw_data = read_bytes(test_file)
+        n_vars, m = parse_instance_size(raw_data)
+        test_data = raw_data.decode()
         case_start = time.time()
+        case_stored_time = counts["stored_time"]
         
-        # 1. Compute bound (trivial m)
-        bound_stdout, _, _, bound_time = run_process(
-            ["python3", path_reduction, "--bound"],
+        # 1. Compute bound (m minus disjoint inconsistent cores)
+        bound_stdout, _, _, bound_time = run_solver(
+            args.store, counts, path_reduction, ["--bound"],
             input_data=test_data,
         )
         try:
@@ -165,52 +258,82 @@ def main():
             bound = m if m else -1
         
         # 2. Run reduction to build MIS instance
-        reduction_stdout, _, _, red_time = run_process(
-            ["python3", path_reduction],
+        reduction_stdout, _, _, red_time = run_solver(
+            args.store, counts, path_reduction, [],
             input_data=test_data,
         )
         
         # 3. Run Max Independent Set heuristic on reduced graph
-        mis_stdout, _, _, mis_time = run_process(
-            ["python3", path_max_ind_set, "--t", str(MIS_TIME_LIMIT)],
-            input_data=reduction_stdout + ("\n" if not reduction_stdout.endswith("\n") else ""),
+        mis_stdout, _, _, mis_time = run_solver(
+            args.store, counts, path_max_ind_set, ["--t", str(MIS_TIME_LIMIT)],
+            # as is: max_ind_set.py reads lines, a missing final newline is fine
+            input_data=reduction_stdout,
         )
         mis_size = parse_mis_size(mis_stdout)
         
         # 4. Get approximation result directly on Max-3-SAT
-        approx_stdout, _, _, approx_elapsed = run_process(
-            ["python3", path_approx, "-t", str(approx_time), test_file],
+        # (--bound: approx stops as soon as it meets its own proven bound)
+        approx_options = ["-t", str(approx_time), "--bound"]
+        if args.cache:
+            approx_options += ["--cache", args.cache]
+        approx_stdout, approx_stderr, _, approx_elapsed = run_solver(
+            args.store, counts, path_approx, approx_options,
+            instance=(test_file, raw_data),
         )
         try:
             approx_score = int(approx_stdout.splitlines()[0])
         except Exception:
             approx_score = -1
+        approx_bound = parse_approx_bound(approx_stderr)
+        if approx_bound is not None and approx_bound < bound:
+            bound = approx_bound
+        gap = bound - approx_score if approx_score >= 0 and bound >= 0 else ""
         
-        # 5. Run exact solver when feasible
+        # 5. Run exact solver when feasible; a zero gap already proves optimality
+        # (exact.py stops itself at -t and still reports its best so far)
         exact_score = ""
+        exact_best = ""
+        exact_explored = ""
+        exact_upper = ""
         exact_time = 0.0
-        if not args.skip_exact and n_vars > 0 and n_vars <= args.max_exact_n:
-            exact_stdout, _, exact_rc, exact_time = run_process(
-                ["python3", path_exact, test_file],
-                timeout=args.exact_timeout,
+        if gap == 0:
+            exact_score = exact_best = exact_upper = approx_score
+        elif not args.skip_exact and n_vars > 0 and n_vars <= args.max_exact_n:
+            exact_stdout, exact_stderr, exact_rc, exact_time = run_solver(
+                args.store, counts, path_exact,
+                ["-p", str(args.exact_procs), "-t", str(args.exact_timeout)],
+                instance=(test_file, raw_data),
+                timeout=args.exact_timeout + EXACT_GRACE,
             )
             if exact_rc == 0 and exact_stdout:
                 try:
-                    exact_score = int(exact_stdout.splitlines()[0])
+                    exact_best = int(exact_stdout.splitlines()[0])
                 except Exception:
-                    exact_score = ""
-        total_wall_time = time.time() - case_start
+                    exact_best = ""
+            if exact_best != "":
+                partial = parse_exact_progress(exact_stderr)
+                if partial is None:
+                    exact_score = exact_upper = exact_best
+                    exact_explored = 1.0
+                else:
+                    exact_explored, exact_upper = partial
+        # stored runs count with the time they originally took
+        total_wall_time = time.time() - case_start + counts["stored_time"] - case_stored_time
             
         results.append({
             "Test Case": case_name,
             "Clauses (m)": m,
             "Bound": bound,
             "Approx MaxSAT": approx_score,
+            "Optimality Gap": gap,
             "MIS Independent Set": mis_size,
             "Reduction Time (s)": red_time,
             "MIS Solve Time (s)": mis_time,
             "Approx Time (s)": approx_elapsed,
             "Exact Optimal": exact_score,
+            "Exact Best": exact_best,
+            "Exact Explored": exact_explored,
+            "Exact Upper Bound": exact_upper,
             "Exact Solve Time (s)": exact_time,
             "Wall Clock Time (s)": total_wall_time,
         })
@@ -222,11 +345,15 @@ def main():
             "Clauses (m)",
             "Bound",
             "Approx MaxSAT",
+            "Optimality Gap",
             "MIS Independent Set",
             "Reduction Time (s)",
             "MIS Solve Time (s)",
             "Approx Time (s)",
             "Exact Optimal",
+            "Exact Best",
+            "Exact Explored",
+            "Exact Upper Bound",
             "Exact Solve Time (s)",
             "Wall Clock Time (s)",
         ]
@@ -236,6 +363,8 @@ def main():
             writer.writerow(row)
             
     print(f"Results saved to {results_file}")
+    if args.store:
+        print(f"{counts['stored']} solver run(s) taken from {args.store}, {counts['run']} run now")
 
 if __name__ == "__main__":
     main()
@@ -79,7 +79,7 @@ def main():
     # Plot 2: Approximation and (when available) Optimal vs bound on one plot
     sizes_sorted, bounds_sorted, approx_sorted = zip(*approx_data)
     plt.figure(figsize=(10, 6))
-    plt.plot(sizes_sorted, bounds_sorted, 'k--', label='Upper Bound (m)')
+    plt.plot(sizes_sorted, bounds_sorted, 'k--', label='Upper Bound')
     plt.plot(sizes_sorted, approx_sorted, 'r.-', label='Approx Max-3-SAT')
     if bound_vs_exact:
         x_sizes, x_bounds, x_exact = zip(*bound_vs_exact)
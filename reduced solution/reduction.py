@@ -1,6 +1,16 @@
+import os
 import sys
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+from bound import core_bound
+from instance import Instance
+from loader import parse, triples
+from preprocess import preprocess
+
+BOUND_TIME_LIMIT = 2  # seconds spent looking for cores in --bound
+OUTPUT_CHUNK = 1 << 16  # edge lines per write
+
 def parse_input():
     """
     Reads Max 3-SAT input from stdin.
@@ -8,30 +18,16 @@ def parse_input():
     n m
     l1 l2 l3
     ...
+    DIMACS cnf/wcnf and gzipped input are accepted too (common/loader.py).
+    Clause weights are ignored: every clause is one triangle in the graph.
     """
     try:
-        input_data = sys.stdin.read().strip().split()
-        if not input_data:
+        data = sys.stdin.buffer.read()
+        if not data.strip():
             return None
-        
-        iterator = iter(input_data)
-        try:
-            n = int(next(iterator))
-            m = int(next(iterator))
-        except StopIteration:
-            return None
-
-        clauses = []
-        for _ in range(m):
-            try:
-                l1 = int(next(iterator))
-                l2 = int(next(iterator))
-                l3 = int(next(iterator))
-                clauses.append((l1, l2, l3))
-            except StopIteration:
-                break
-        
-        return n, m, clauses
+        n, lits, _ = parse(data)
+        clauses = triples(lits)
+        return n, len(clauses), clauses
     except Exception as e:
         sys.stderr.write(f"Error parsing input: {e}\n")
         return None
@@ -43,9 +39,9 @@ def is_consistent(l1, l2):
     return l1 != -l2
 
 
-def reduce_to_independent_set(n, c, clauses):
+def iter_edges(clauses):
     """
-    Reduces Max 3-SAT to Maximum Independent Set (MIS).
+    Yields the edges of the Maximum Independent Set (MIS) graph for clauses.
     
     From the problem description:
     The graph G contains exactly 3c vertices (where c is the number of clauses).
@@ -53,48 +49,85 @@ def reduce_to_independent_set(n, c, clauses):
     1. They correspond to literals in the SAME clause (forming a triangle per clause).
     2. They correspond to a variable and its inverse (contradictory literals).
     
-    Runtime: O(c^2) where c is the number of clauses.
-    Returns (num_vertices, edges)
+    Vertex 3i+k+1 is literal k of clause i. Rather than testing every pair
+    of vertices, the vertices are indexed by literal: the edges are the
+    clause triangles plus each vertex joined to the vertices of its negated
+    literal in later clauses (earlier ones already produced that edge).
+    Runtime: O(c + |E|) where |E| is the number of edges; only the O(c)
+    index is held in memory.
+    Edges come as (u, v) with u < v, in sorted order.
     """
-    edges = []
-    num_vertices = 3 * c
+    # literal -> its vertices, in increasing order
+    vertices_of = {}
+    for i, clause in enumerate(clauses):
+        for k, lit in enumerate(clause):
+            vertices_of.setdefault(lit, []).append(3 * i + k + 1)
     
-    # List of literals with their clause index (clause_idx, literal_value)
-    flat_literals = []
+    # literal -> how many of its vertices are in clauses up to the current one
+    passed = dict.fromkeys(vertices_of, 0)
     for i, clause in enumerate(clauses):
         for lit in clause:
-            flat_literals.append((i, lit))
-            
-    #  Build edges: Iterate over all pairs of vertices
-    for i in range(len(flat_literals)):
-        for j in range(i + 1, len(flat_literals)):
-            c1_idx, l1 = flat_literals[i]
-            c2_idx, l2 = flat_literals[j]
-            
-            is_connected = False
-            
+            passed[lit] += 1
+        clause_end = 3 * i + 3
+        for k, lit in enumerate(clause):
+            u = 3 * i + k + 1
             # Condition 1: Literals in the SAME clause
-            if c1_idx == c2_idx:
-                is_connected = True
-            
+            for v in range(u + 1, clause_end + 1):
+                yield u, v
             # Condition 2: Variable and its inverse (Contradictory)
-            elif l1 == -l2:
-                is_connected = True
-            
-            if is_connected:
-                # Add edge (1-based indices)
-                u = i + 1
-                v = j + 1
-                edges.append((u, v))
-                
-    return num_vertices, edges
+            opposite = vertices_of.get(-lit)
+            if opposite:
+                for v in opposite[passed[-lit]:]:
+                    yield u, v
+
+def count_edges(clauses):
+    """
+    Number of edges iter_edges(clauses) yields, from literal occurrence
+    counts: 3 per clause triangle plus occurrences(l) * occurrences(-l)
+    for every literal pair, less the complementary pairs that sit in the
+    same clause (their edge is part of the triangle).
+    """
+    occurrences = {}
+    same_clause = 0
+    for clause in clauses:
+        for k, lit in enumerate(clause):
+            occurrences[lit] = occurrences.get(lit, 0) + 1
+            same_clause += sum(1 for other in clause[k + 1:] if other == -lit)
+    opposite = sum(count * occurrences.get(-lit, 0)
+                   for lit, count in occurrences.items() if lit > 0)
+    return 3 * len(clauses) + opposite - same_clause
+
+def reduce_to_independent_set(n, c, clauses):
+    """
+    Reduces Max 3-SAT to Maximum Independent Set (MIS), see iter_edges.
+    Returns (num_vertices, edges) with the edges in a list.
+    """
+    return 3 * c, list(iter_edges(clauses))
+
+def write_edges(out, clauses):
+    """
+    Writes the MIS instance to the text stream out: the edge count, then
+    one "u v" line per edge. The edges are never all in memory; their
+    lines go out OUTPUT_CHUNK at a time.
+    """
+    out.write(f"{count_edges(clauses)}\n")
+    lines = []
+    for u, v in iter_edges(clauses):
+        lines.append(f"{u} {v}\n")
+        if len(lines) == OUTPUT_CHUNK:
+            out.write("".join(lines))
+            lines.clear()
+    out.write("".join(lines))
 
 def compute_bound(n, c, clauses):
     """
     Computes an upper bound on the max number of satisfied clauses.
-    Returns: c (total clauses).
+    c minus one clause per disjoint inconsistent core found within
+    BOUND_TIME_LIMIT seconds (common/bound.py); never above c.
     """
-    return c
+    pre = preprocess(Instance.from_clauses(n, clauses))
+    bound, _ = core_bound(pre.clauses, pre.weights, BOUND_TIME_LIMIT)
+    return bound + pre.satisfied
 
 def main():
     """
@@ -113,12 +146,8 @@ def main():
         print(compute_bound(n, m, clauses))
         return
     
-    num_vertices, edges = reduce_to_independent_set(n, m, clauses)
-    
     # Output format for Maximum Independent Set (MIS)
-    print(len(edges))
-    for u, v in edges:
-        print(f"{u} {v}")
+    write_edges(sys.stdout, clauses)
 
 if __name__ == "__main__":
     main()